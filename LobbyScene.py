@@ -3,13 +3,19 @@ from config import (
     SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_SIZE, GRID_SIZE,
     CELL_SIZE, SNAKE_COLOR, SNAKE_EYE_COLOR
 )
-from snake_game import play, play_multiple_games
+from snake_game import play, replay_game
+from background_job import evaluation_job, training_job
+from evaluation import format_report
+from Scene import Scene
 import itertools
 
 BTN_COLOR = (60, 120, 220)
 BTN_HOVER = (80, 140, 240)
 TEXT = (240, 240, 240)
 TITLE = (255, 255, 255)
+STATUS_BG = (0, 0, 0, 160)
+# Choices cycled by the games button
+GAME_COUNTS = (100, 1000, 10000, 100000)
 
 
 class Button:
@@ -18,28 +24,40 @@ class Button:
         self.text = text
         self.onclick = onclick
         self.hover = False
+        self.label = None
 
     def draw(self, screen, font):
         color = BTN_HOVER if self.hover else BTN_COLOR
         pygame.draw.rect(screen, color, self.rect, border_radius=8)
-        label = font.render(self.text, True, TEXT)
+        if self.label is None or self.label[0] != self.text:
+            self.label = (self.text, font.render(self.text, True, TEXT))
+        label = self.label[1]
         screen.blit(label, (self.rect.centerx - label.get_width()//2,
                             self.rect.centery - label.get_height()//2))
 
     def handle(self, event):
+        # True when the button looks different afterwards
         if event.type == pygame.MOUSEMOTION:
-            self.hover = self.rect.collidepoint(event.pos)
+            hover = self.rect.collidepoint(event.pos)
+            changed = hover != self.hover
+            self.hover = hover
+            return changed
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             if self.rect.collidepoint(event.pos):
                 self.onclick()
+                return True
+        return False
 
 
-class LobbyScene:
+class LobbyScene(Scene):
     def __init__(self, q_table, defaults=None):
         self.q_table = q_table
         self.font = pygame.font.Font(None, 30)
         self.title_font = pygame.font.Font(None, 64)
+        self.status_font = pygame.font.Font(None, 24)
         self.status = ""
+        # Board, "42" snake and title never change; rendered on first draw
+        self.background = None
 
         # Simple defaults (extend or replace with a proper Settings scene)
         self.cfg = {
@@ -49,17 +67,21 @@ class LobbyScene:
             "gamma": 0.9,
             "verbose": False,
             "max": 0,
+            "grid_size": GRID_SIZE,
+            "games": 1000,
         }
         if defaults:
             self.cfg.update(defaults)
 
         x = SCREEN_SIZE + 20
         w = SCREEN_WIDTH - SCREEN_SIZE - 40
-        h = 50
-        gap = 20
+        h = 40
+        gap = 12
         labels = [
             ("Play", self.on_play),
             ("Play Max", self.on_play_multiple),
+            ("Train", self.on_train),
+            (f"Games: {self.cfg['games']}", self.on_games),
             ("Toggle Verbose", self.on_toggle_verbose),
             ("Quit", self.on_quit),
         ]
@@ -73,23 +95,75 @@ class LobbyScene:
         for text, cb in labels:
             self.buttons.append(Button((x, y, w, h), text, cb))
             y += h + gap
+        self.play_max_button = self.buttons[1]
+        self.train_button = self.buttons[2]
+        self.games_button = self.buttons[3]
+
+        # Running BackgroundJob, its button and that button's own label,
+        # and the last progress line shown
+        self.job = None
+        self.job_button = None
+        self.job_label = None
+        self.job_line = ""
 
     def on_play(self):
         self.status = "Starting game..."
-        play(self.q_table, verbose=self.cfg["verbose"])
+        play(self.q_table, verbose=self.cfg["verbose"],
+             grid_size=self.cfg["grid_size"])
         self.status = "Returned from game."
 
     def on_play_multiple(self):
-        try:
-            nb_games = int(input("Enter the number of games to play: "))
-            if nb_games <= 0:
-                raise ValueError("Number of games must be positive.")
-            self.status = f"Playing {nb_games} games..."
-            play_multiple_games(self.q_table, verbose=self.cfg["verbose"],
-                                num_games=nb_games)
-            self.status = f"Finished playing {nb_games} games."
-        except ValueError as e:
-            self.status = f"Invalid input: {e}"
+        self.start_job(self.play_max_button, evaluation_job(
+            self.q_table, self.cfg["games"],
+            grid_size=self.cfg["grid_size"], verbose=self.cfg["verbose"]))
+
+    def on_train(self):
+        self.start_job(self.train_button, training_job(
+            self.q_table, self.cfg["episodes"], self.cfg["epsilon"],
+            self.cfg["alpha"], self.cfg["gamma"],
+            grid_size=self.cfg["grid_size"]))
+
+    def on_games(self):
+        i = GAME_COUNTS.index(self.cfg["games"]) if (
+            self.cfg["games"] in GAME_COUNTS) else -1
+        self.cfg["games"] = GAME_COUNTS[(i + 1) % len(GAME_COUNTS)]
+        self.games_button.text = f"Games: {self.cfg['games']}"
+
+    def start_job(self, button, job):
+        # The button of the running job cancels it
+        if self.job is not None:
+            if button is self.job_button:
+                self.job.cancel()
+                self.status = f"Cancelling {self.job.name.lower()}..."
+            else:
+                self.status = f"{self.job.name} is still running."
+            return
+        self.job = job.start()
+        self.job_button = button
+        self.job_label = button.text
+        button.text = "Cancel"
+        self.status = ""
+
+    def finish_job(self):
+        job = self.job
+        self.job = None
+        self.job_button.text = self.job_label
+        self.job_line = ""
+        self.dirty = True
+        if job.error is not None:
+            self.status = f"{job.name} failed: {job.error}"
+        elif job.name == "Training":
+            self.status = (f"Trained {job.result} episodes "
+                           f"(best length {job.best}), not saved.")
+        elif job.result is None:
+            self.status = "Evaluation cancelled."
+        else:
+            stats, best_game = job.result
+            print(format_report(stats))
+            self.status = (f"{stats['games']} games: mean "
+                           f"{stats['mean']:.2f}, max {stats['max']}")
+            if not job.cancelled:
+                replay_game(best_game)
 
     def on_quit(self):
         pygame.event.post(pygame.event.Event(pygame.QUIT))
@@ -100,11 +174,45 @@ class LobbyScene:
 
     def handle_event(self, event):
         for b in self.buttons:
-            b.handle(event)
+            if b.handle(event):
+                self.dirty = True
 
-    def update(self, dt): pass
+    def update(self, dt):
+        # Polled at least every IDLE_WAIT_MS, which paces the progress line
+        if self.job is None:
+            return
+        if self.job.done:
+            self.finish_job()
+            return
+        line = self.job.describe()
+        if line != self.job_line:
+            self.job_line = line
+            self.dirty = True
 
     def draw(self, screen):
+        if self.background is None:
+            self.background = screen.copy()
+            self.draw_background(self.background)
+        screen.blit(self.background, (0, 0))
+
+        # Right panel and buttons
+        for b in self.buttons:
+            b.draw(screen, self.font)
+
+        # Job progress and status, at the bottom of the board
+        lines = [line for line in (self.job_line, self.status) if line]
+        if lines:
+            strip = pygame.Surface((SCREEN_SIZE, 12 + 24 * len(lines)),
+                                   pygame.SRCALPHA)
+            strip.fill(STATUS_BG)
+            y = SCREEN_HEIGHT - strip.get_height()
+            screen.blit(strip, (0, y))
+            for line in lines:
+                label = self.status_font.render(line, True, TEXT)
+                screen.blit(label, (10, y + 8))
+                y += 24
+
+    def draw_background(self, screen):
         # Left: game board area with checkered grid
         for x in range(0, SCREEN_SIZE, CELL_SIZE):
             for y in range(0, SCREEN_SIZE, CELL_SIZE):
@@ -149,10 +257,6 @@ class LobbyScene:
             screen.blit(title, (x_offset, 20))
             x_offset += title.get_width()
 
-        # Right panel and buttons
-        for b in self.buttons:
-            b.draw(screen, self.font)
-
 
 def _digit_glyph(d):
     # 3x5 monospace glyphs
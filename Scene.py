@@ -1,7 +1,20 @@
 import pygame
 
+# Longest wait for an event while the scene is idle; update() still runs
+# this often so scenes can notice outside changes
+IDLE_WAIT_MS = 250
+
+# Events after which the window content has to be drawn again
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED,
+                 pygame.WINDOWSIZECHANGED, pygame.WINDOWRESTORED)
+
 
 class Scene:
+    # Set dirty when the next frame differs from the last one drawn;
+    # while animating, frames are drawn at the manager's fps
+    dirty = True
+    animating = False
+
     def handle_event(self, event): pass
     def update(self, dt): pass
     def draw(self, screen): pass
@@ -15,14 +28,25 @@ class SceneManager:
         clock = pygame.time.Clock()
         running = True
         while running:
-            dt = clock.tick(fps) / 1000.0
-            for event in pygame.event.get():
+            if self.current.animating:
+                dt = clock.tick(fps) / 1000.0
+                events = pygame.event.get()
+            else:
+                # Sleep until something happens instead of polling
+                events = [pygame.event.wait(IDLE_WAIT_MS)]
+                events.extend(pygame.event.get())
+                dt = clock.tick() / 1000.0
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
-                else:
+                elif event.type in EXPOSE_EVENTS:
+                    self.current.dirty = True
+                elif event.type != pygame.NOEVENT:
                     self.current.handle_event(event)
             self.current.update(dt)
-            screen.fill((25, 25, 30))
-            self.current.draw(screen)
-            pygame.display.flip()
+            if self.current.dirty or self.current.animating:
+                self.current.dirty = False
+                screen.fill((25, 25, 30))
+                self.current.draw(screen)
+                pygame.display.flip()
         pygame.display.quit()
@@ -0,0 +1,96 @@
+import threading
+import time
+from config import GRID_SIZE
+from evaluation import evaluate
+from snake_game import record_best_game, train
+
+
+class BackgroundJob:
+    """
+    Runs work(job) on a daemon thread so a GUI loop can keep polling.
+
+    work reports through job.progress(count, best) and should return soon
+    after job.stop is set. Once done is True, result holds work's return
+    value, or error the exception it raised. Counters are written by the
+    worker thread and only read by the GUI, so no lock is needed.
+    """
+
+    def __init__(self, name, total, work):
+        self.name = name
+        self.total = total
+        self.work = work
+        self.count = 0
+        self.best = 0
+        self.stop = threading.Event()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.thread = threading.Thread(target=self._run, name=name,
+                                       daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.work(self)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.monotonic()
+            self.done = True
+
+    def progress(self, count, best):
+        self.count = count
+        self.best = max(self.best, best)
+
+    def cancel(self):
+        self.stop.set()
+
+    @property
+    def cancelled(self):
+        return self.stop.is_set()
+
+    def rate(self):
+        # Games or episodes per second so far
+        end = self.finished if self.done else time.monotonic()
+        elapsed = end - self.started if self.started is not None else 0
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def describe(self):
+        return (f"{self.name}: {self.count}/{self.total}, "
+                f"{self.rate():.0f}/s, best {self.best}")
+
+
+def evaluation_job(q_table, num_games, grid_size=GRID_SIZE, workers=None,
+                   verbose=False):
+    # Result: (stats, best game Trajectory), or None if nothing was played
+    def work(job):
+        def on_progress(results):
+            # Only the games of the new chunk can raise the best length
+            job.progress(len(results),
+                         max(length for _, length, _ in results[job.count:]))
+
+        stats = evaluate(q_table, num_games, workers=workers,
+                         grid_size=grid_size, on_progress=on_progress,
+                         stop=job.stop)
+        if stats is None:
+            return None
+        return stats, record_best_game(q_table, stats, grid_size,
+                                       verbose)
+    return BackgroundJob("Evaluation", num_games, work)
+
+
+def training_job(q_table, num_episodes, epsilon, alpha, gamma,
+                 grid_size=GRID_SIZE):
+    # Trains q_table in place, without the preview window
+    def work(job):
+        train(num_episodes, epsilon, alpha, gamma, q_table,
+              grid_size=grid_size, render_every=None,
+              on_episode=job.progress, stop=job.stop)
+        return job.count
+    return BackgroundJob("Training", num_episodes, work)
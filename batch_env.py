@@ -0,0 +1,258 @@
+import numpy as np
+from config import GRID_SIZE
+
+
+# Same order as the actions: Up, Down, Left, Right
+DIRECTIONS = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)], dtype=np.int64)
+
+EMPTY = 0
+GREEN = 1
+RED = 2
+
+# Birth step of a cell no segment has entered
+NO_SEGMENT = -(1 << 30)
+# Random draws tried per apple before scanning the whole board
+SPAWN_TRIES = 8
+
+
+def build_ray_tables(grid_size):
+    """
+    For every cell, the cells seen along the four vision rays and the
+    normalized wall distance reported by get_state for that direction.
+
+    Rays are padded with the sentinel index grid_size ** 2, a cell that is
+    never occupied, so they can be gathered as one rectangular array.
+    """
+    cells = grid_size * grid_size
+    rays = np.full((cells, 4, grid_size), cells, dtype=np.int64)
+    dist = np.zeros((cells, 4), dtype=np.float64)
+    for y in range(grid_size):
+        for x in range(grid_size):
+            for d, (dx, dy) in enumerate(DIRECTIONS.tolist()):
+                cx, cy = x + dx, y + dy
+                n = 0
+                while 0 <= cx < grid_size and 0 <= cy < grid_size:
+                    rays[y * grid_size + x, d, n] = cy * grid_size + cx
+                    n += 1
+                    cx += dx
+                    cy += dy
+                dist[y * grid_size + x, d] = round((n + 1) / grid_size, 2)
+    return rays, dist
+
+
+class BatchSnakeEnv:
+    """
+    N independent Snake boards stepped together with NumPy.
+
+    The rules match SnakeEnv. Each board keeps:
+      - birth:   per-cell move number at which the head entered the cell;
+                 a cell is body while birth > moves - length,
+      - objects: per-cell apple codes (EMPTY, GREEN, RED),
+      - head position, direction, length, move count and apple coordinates.
+
+    A move writes only the new head cell and the tail follows from the
+    length, and apples spawn by rejection sampling, so a step costs the
+    same whatever the snake lengths and board size. Boards that finish are
+    respawned inside step(); their final lengths are left in final_lengths.
+    """
+
+    def __init__(self, num_envs, grid_size=GRID_SIZE, seed=None,
+                 num_green=2, length=3):
+        self.num_envs = num_envs
+        self.grid_size = grid_size
+        self.num_green = num_green
+        self.start_length = length
+        self.cells = grid_size * grid_size
+        self.rng = np.random.default_rng(seed)
+        self.rays, self.dist = build_ray_tables(grid_size)
+        self.rows = np.arange(num_envs)
+
+        n = num_envs
+        self.birth = np.full((n, self.cells + 1), NO_SEGMENT, dtype=np.int32)
+        self.objects = np.zeros((n, self.cells + 1), dtype=np.int8)
+        self.head_x = np.zeros(n, dtype=np.int64)
+        self.head_y = np.zeros(n, dtype=np.int64)
+        self.dir = np.zeros((n, 2), dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.moves = np.zeros(n, dtype=np.int64)
+        # Length when the head was written; the body between moves is the
+        # cells born after moves - head_value, growth shows on the next move
+        self.head_value = np.zeros(n, dtype=np.int64)
+        self.greens = np.zeros((n, num_green), dtype=np.int64)
+        self.red = np.zeros(n, dtype=np.int64)
+        self.final_lengths = np.zeros(n, dtype=np.int64)
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_boards(self.rows)
+        return self.states()
+
+    def _reset_boards(self, idx):
+        if len(idx) == 0:
+            return
+        g = self.grid_size
+        length = self.start_length
+        self.birth[idx] = NO_SEGMENT
+        self.objects[idx] = EMPTY
+
+        d = DIRECTIONS[self.rng.integers(0, 4, size=len(idx))]
+        dx, dy = d[:, 0], d[:, 1]
+        # Keep the whole body (placed opposite the movement) on the board
+        min_x = np.where(dx == 1, length - 1, 0)
+        max_x = np.where(dx == -1, g - length, g - 1)
+        min_y = np.where(dy == 1, length - 1, 0)
+        max_y = np.where(dy == -1, g - length, g - 1)
+        hx = self.rng.integers(min_x, max_x + 1)
+        hy = self.rng.integers(min_y, max_y + 1)
+        for i in range(length):
+            pos = (hy - dy * i) * g + (hx - dx * i)
+            self.birth[idx, pos] = -i
+
+        self.head_x[idx] = hx
+        self.head_y[idx] = hy
+        self.dir[idx] = d
+        self.length[idx] = length
+        self.moves[idx] = 0
+        self.head_value[idx] = length
+
+        for j in range(self.num_green):
+            pos = self._random_empty_cells(idx)
+            self.greens[idx, j] = pos
+            self.objects[idx, pos] = GREEN
+        self.red[idx] = self._random_empty_cells(idx)
+        self.objects[idx, self.red[idx]] = RED
+        self.objects[:, self.cells] = EMPTY
+
+    def _tail(self, idx):
+        # Cells born at or before this move are no longer body
+        return self.moves[idx] - self.head_value[idx]
+
+    def _is_free(self, idx, pos):
+        return ((self.birth[idx, pos] <= self._tail(idx))
+                & (self.objects[idx, pos] == EMPTY))
+
+    def _random_empty_cells(self, idx):
+        # Uniform pick among free cells of each board: random cells are
+        # drawn until free, boards still unlucky after SPAWN_TRIES are
+        # scanned
+        pos = self.rng.integers(0, self.cells, size=len(idx))
+        todo = np.flatnonzero(~self._is_free(idx, pos))
+        for _ in range(SPAWN_TRIES):
+            if not len(todo):
+                return pos
+            pos[todo] = self.rng.integers(0, self.cells, size=len(todo))
+            todo = todo[~self._is_free(idx[todo], pos[todo])]
+        if len(todo):
+            pos[todo] = self._scan_empty_cells(idx[todo])
+        return pos
+
+    def _scan_empty_cells(self, idx):
+        # Uniform pick among free cells of each board, one array pass
+        free = ((self.birth[idx, :self.cells] <= self._tail(idx)[:, None])
+                & (self.objects[idx, :self.cells] == EMPTY))
+        keys = self.rng.random((len(idx), self.cells))
+        keys[~free] = -1.0
+        pos = keys.argmax(axis=1)
+        # Full board: park the apple on the sentinel cell
+        return np.where(free.any(axis=1), pos, self.cells)
+
+    def states(self):
+        inside = np.ones(self.num_envs, dtype=bool)
+        head = self.head_y * self.grid_size + self.head_x
+        return self._states(head, inside)
+
+    def _states(self, head, inside):
+        head = np.where(inside, head, 0)
+        rays = self.rays[head]
+        rows = self.rows[:, None, None]
+        tail = (self.moves - self.head_value)[:, None, None]
+        body_nearby = (self.birth[rows, rays] > tail).any(axis=2)
+        objs = self.objects[rows, rays]
+        states = np.empty((self.num_envs, 4, 4), dtype=np.float64)
+        states[:, :, 0] = self.dist[head]
+        states[:, :, 1] = (objs == GREEN).any(axis=2)
+        states[:, :, 2] = (objs == RED).any(axis=2)
+        states[:, :, 3] = body_nearby
+        states = states.reshape(self.num_envs, 16)
+        # A head that left the grid gets an all-zero (terminal) state
+        states[~inside] = 0.0
+        return states
+
+    def step(self, actions):
+        """
+        Apply one action per board and return (next_states, rewards, dones).
+
+        next_states is measured right after the move, before apples respawn
+        and before finished boards are reset, like SnakeEnv.step.
+        """
+        g = self.grid_size
+        rows = self.rows
+        prev_x = self.head_x
+        d = DIRECTIONS[actions]
+        self.dir = d
+        nx = self.head_x + d[:, 0]
+        ny = self.head_y + d[:, 1]
+        inside = (nx >= 0) & (nx < g) & (ny >= 0) & (ny < g)
+        head = np.where(inside, ny * g + nx, self.cells)
+
+        # Advance every body by one cell: with the move counted, the tail
+        # (after any pending growth/shrink) is wherever moves - length falls
+        moves = self.moves + 1
+        hit_body = self.birth[rows, head] > moves - self.length
+        obj = self.objects[rows, head]
+        self.birth[rows, head] = np.where(inside, moves, NO_SEGMENT)
+        self.moves = moves
+        self.head_value = self.length.copy()
+        self.head_x, self.head_y = nx, ny
+
+        # Rewards, in the same priority order as calculate_reward
+        gx = self.greens % g
+        gy = self.greens // g
+        gdist = np.abs(gx - nx[:, None]) + np.abs(gy - ny[:, None])
+        gdist[self.greens == self.cells] = np.iinfo(np.int64).max
+        closest = gx[rows, gdist.argmin(axis=1)]
+        # calculate_reward compares the x distance only
+        closer = np.abs(closest - nx) < np.abs(closest - prev_x)
+        dead = ~inside | hit_body
+        rewards = np.where(closer & (self.length >= 2), 1, -1)
+        rewards[dead] = -100
+        rewards[obj == RED] = -10
+        rewards[obj == GREEN] = 10
+
+        next_states = self._states(head, inside)
+
+        # Green apples: grow and respawn
+        ate = np.flatnonzero(~dead & (obj == GREEN))
+        if len(ate):
+            self.length[ate] += 1
+            self.objects[ate, head[ate]] = EMPTY
+            # Drop the eaten apple and append the new one, keeping order
+            eaten = (self.greens[ate] == head[ate, None]).argmax(axis=1)
+            greens = self.greens[ate]
+            for j in range(self.num_green - 1):
+                greens[:, j] = np.where(j >= eaten, greens[:, j + 1],
+                                        greens[:, j])
+            pos = self._random_empty_cells(ate)
+            greens[:, -1] = pos
+            self.greens[ate] = greens
+            self.objects[ate, pos] = GREEN
+
+        # Red apple: shrink, maybe die, respawn
+        ate = np.flatnonzero(~dead & (obj == RED))
+        if len(ate):
+            self.length[ate] -= 1
+            dead[ate] |= self.length[ate] <= 0
+            ate = ate[self.length[ate] > 0]
+            pos = self._random_empty_cells(ate)
+            moved = pos != self.cells
+            ate, pos = ate[moved], pos[moved]
+            self.objects[ate, self.red[ate]] = EMPTY
+            self.red[ate] = pos
+            self.objects[ate, pos] = RED
+        self.objects[:, self.cells] = EMPTY
+
+        self.final_lengths = np.where(dead, self.length, 0)
+        self._reset_boards(np.flatnonzero(dead))
+        return next_states, rewards, dead
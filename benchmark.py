@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Reproducible micro-benchmarks of the engine, learner and renderer.
+
+Every case runs from fixed seeds and reports the best per-call time over
+a few repeats. Results are written as JSON; pass -baseline to compare
+against a stored run, e.g.
+
+    python benchmark.py -out baseline.json
+    python benchmark.py -baseline baseline.json
+
+-startup_budget checks that a fresh "import main" stays under a time
+budget and does not load pygame or matplotlib, e.g. in sweep scripts:
+
+    python benchmark.py -startup_budget 400
+
+Rendering uses the dummy SDL video driver, so no window is opened.
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+import q_algorithm  # noqa: E402
+from config import GRID_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT  # noqa: E402
+from q_algorithm import choose_action, update_q_value  # noqa: E402
+from q_table_storage import DenseQTable, load_q_table  # noqa: E402
+from q_table_storage import save_q_table  # noqa: E402
+from state_encoding import decode_state, num_states  # noqa: E402
+from snake_env import SnakeEnv  # noqa: E402
+from parallel_train import run_episode  # noqa: E402
+from snake_game import draw_frame  # noqa: E402
+from renderer import BoardRenderer  # noqa: E402
+
+GRID_SIZES = (10, 20, 40)
+SNAKE_LENGTHS = (3, 20, 80)
+TABLE_SIZES = (1000, 100000)
+# Dense tables hold grid_size^2 * 4096 rows, so larger grids are skipped
+DENSE_GRID_SIZES = (10, 20)
+# Modules that only the drawing code paths may import
+LAZY_MODULES = ("pygame", "matplotlib")
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(fn, number, repeat=5):
+    # Best seconds per call of fn() over repeat runs of number calls
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def hamiltonian_cycle(grid_size):
+    """
+    A cycle through every cell of an even-sized grid.
+
+    Row 0 left to right, rows 1.. in a serpentine over columns 1..G-1, then
+    back up column 0. A snake following it never collides at any length.
+    """
+    cycle = [(x, 0) for x in range(grid_size)]
+    for y in range(1, grid_size):
+        xs = range(grid_size - 1, 0, -1) if y % 2 else range(1, grid_size)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(grid_size - 1, 0, -1))
+    return cycle
+
+
+def make_env(grid_size, length, apples=True, seed=0):
+    # Env with a snake of the given length laid along hamiltonian_cycle
+    cycle = hamiltonian_cycle(grid_size)
+    length = min(length, len(cycle) - 4)
+    snake = cycle[length - 1::-1]
+    head, after = cycle[length - 1], cycle[length]
+    snake_dir = (after[0] - head[0], after[1] - head[1])
+    env = SnakeEnv(grid_size=grid_size, seed=seed)
+    env.restore((snake, snake_dir, length, [], None))
+    if apples:
+        for _ in range(env.num_green):
+            env._place_green(env._random_empty_cell())
+        env._place_red(env._random_empty_cell())
+    return env, cycle
+
+
+def sample_states(grid_size, count, seed=0):
+    # States met by a random policy, as seen by choose_action
+    rng = random.Random(seed)
+    env = SnakeEnv(grid_size=grid_size, seed=seed)
+    states = []
+    while len(states) < count:
+        state = env.get_state()
+        states.append((state, env.snake_dir))
+        _, _, done = env.step(rng.randrange(4))
+        if done:
+            env.reset()
+    return states
+
+
+def random_dict_table(grid_size, size, seed=0):
+    rng = random.Random(seed)
+    table = {}
+    while len(table) < size:
+        state = decode_state(rng.randrange(num_states(grid_size) - 1),
+                             grid_size)
+        table[(state, rng.randrange(4))] = rng.uniform(-10, 10)
+    return table
+
+
+def random_dense_table(grid_size, seed=0):
+    values = np.random.default_rng(seed).uniform(
+        -10, 10, (num_states(grid_size), 4)).astype(np.float32)
+    return DenseQTable(grid_size, values)
+
+
+def cycler(items):
+    # fn() returning the next item of items, round robin
+    state = {"i": -1}
+    count = len(items)
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % count
+        return items[state["i"]]
+    return next_item
+
+
+# Each suite yields (name, params, fn, calls[, repeat]); run() times fn
+def bench_engine(scale):
+    for grid_size in GRID_SIZES:
+        for length in SNAKE_LENGTHS:
+            params = {"grid": grid_size, "length": length}
+            env, cycle = make_env(grid_size, length)
+            snake = list(env.snake)
+            greens, red = env.green_apples, env.red_apple
+            yield "env.get_state", params, env.get_state, 2000 * scale
+            yield ("q_algorithm.get_state", params,
+                   lambda: q_algorithm.get_state(snake, greens, red,
+                                                 grid_size),
+                   2000 * scale)
+            prev_head = snake[1]
+            yield ("env.calculate_reward", params,
+                   lambda: env.calculate_reward(prev_head), 5000 * scale)
+            yield ("q_algorithm.calculate_reward", params,
+                   lambda: q_algorithm.calculate_reward(snake, greens, red,
+                                                        grid_size),
+                   2000 * scale)
+
+            # Move along the cycle, so nothing is ever eaten or hit
+            env, cycle = make_env(grid_size, length, apples=False)
+            following = {cell: cycle[(i + 1) % len(cycle)]
+                         for i, cell in enumerate(cycle)}
+
+            def move():
+                head = env.snake[0]
+                after = following[head]
+                env.snake_dir = (after[0] - head[0], after[1] - head[1])
+                env.move_snake()
+                if env.check_collisions():
+                    raise RuntimeError("snake collided on the cycle")
+            yield "move_snake+check_collisions", params, move, 5000 * scale
+
+
+def bench_learner(scale):
+    for grid_size in GRID_SIZES:
+        states = sample_states(grid_size, 1000)
+        tables = [("dict", size, random_dict_table(grid_size, size))
+                  for size in TABLE_SIZES]
+        if grid_size in DENSE_GRID_SIZES:
+            table = random_dense_table(grid_size)
+            tables.append(("dense", len(table.values), table))
+        for kind, size, table in tables:
+            params = {"grid": grid_size, "table": kind, "size": size}
+            pick = cycler(states)
+
+            def choose():
+                state, snake_dir = pick()
+                return choose_action(state, 0.0, snake_dir, table)
+            yield ("choose_action", params, choose, 5000 * scale)
+
+            pairs = cycler([(a[0], b[0])
+                            for a, b in zip(states, states[1:])])
+
+            def update():
+                state, next_state = pairs()
+                update_q_value(state, 1, -1, next_state, 0.1, 0.9, table)
+            yield ("update_q_value", params, update, 5000 * scale)
+
+
+def bench_episodes(scale):
+    for grid_size in GRID_SIZES:
+        params = {"grid": grid_size, "policy": "epsilon=0.1"}
+        random.seed(0)
+        env = SnakeEnv(grid_size=grid_size, seed=0)
+        q_table = {}
+        # Warm the table up first so episodes are not all cold starts
+        for _ in range(200):
+            run_episode(env, 0.1, 0.1, 0.9, q_table)
+        yield ("train_episode", params,
+               lambda: run_episode(env, 0.1, 0.1, 0.9, q_table),
+               20 * scale, 3)
+
+
+def bench_storage(scale):
+    with tempfile.TemporaryDirectory() as folder:
+        for size in TABLE_SIZES:
+            table = random_dict_table(GRID_SIZE, size)
+            dense = DenseQTable.from_dict(table)
+            for kind, filename, saved in (
+                    ("pickle", "q.pkl", table),
+                    ("dense pickle", "dense.pkl", dense),
+                    ("binary", "q.bin", dense)):
+                params = {"format": kind, "size": size}
+                path = os.path.join(folder, filename)
+                yield ("save_q_table", params,
+                       lambda: save_q_table(saved, path), scale, 3)
+                yield ("load_q_table", params,
+                       lambda: load_q_table(path), scale, 3)
+
+
+def bench_render(scale):
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    try:
+        for grid_size in GRID_SIZES:
+            for length in SNAKE_LENGTHS:
+                env, _ = make_env(grid_size, length)
+                params = {"grid": grid_size, "length": length}
+                yield ("draw_frame", params,
+                       lambda: draw_frame(screen, env), 20 * scale, 3)
+
+                # One step along the cycle per frame, as in play and replay
+                env, cycle = make_env(grid_size, length)
+                following = {cell: cycle[(i + 1) % len(cycle)]
+                             for i, cell in enumerate(cycle)}
+                renderer = BoardRenderer(screen, grid_size)
+
+                def step_and_draw():
+                    head = env.snake[0]
+                    after = following[head]
+                    env.snake_dir = (after[0] - head[0], after[1] - head[1])
+                    env.move_snake()
+                    renderer.draw(env)
+                yield ("BoardRenderer.draw", params, step_and_draw,
+                       200 * scale, 3)
+    finally:
+        pygame.quit()
+
+
+def import_main():
+    # A fresh interpreter, so every call pays the full import cost
+    subprocess.run([sys.executable, "-c", "import main"], cwd=REPO,
+                   check=True)
+
+
+def bench_startup(scale):
+    yield "import main", {}, import_main, scale, 5
+
+
+def check_startup(budget_ms):
+    """
+    Returns the problems of a fresh "import main": lazy modules it loaded,
+    and a best time over budget_ms.
+    """
+    probe = "import sys, main; print(' '.join(sys.modules))"
+    loaded = subprocess.run([sys.executable, "-c", probe], cwd=REPO,
+                            check=True, capture_output=True,
+                            text=True).stdout.split()
+    problems = [f"import main loads {module}" for module in LAZY_MODULES
+                if module in loaded]
+    ms = measure(import_main, 1) * 1e3
+    print(f"import main: {ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    if ms > budget_ms:
+        problems.append(f"import main takes {ms:.0f} ms")
+    return problems
+
+
+SUITES = {
+    "engine": bench_engine,
+    "learner": bench_learner,
+    "episodes": bench_episodes,
+    "storage": bench_storage,
+    "render": bench_render,
+    "startup": bench_startup,
+}
+
+
+def case_key(name, params):
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+def run(suites, scale, pattern=None):
+    results = {}
+    for suite in suites:
+        for name, params, fn, number, *repeat in SUITES[suite](scale):
+            key = case_key(name, params)
+            if pattern and pattern not in key:
+                continue
+            seconds = measure(fn, number, *repeat)
+            results[key] = {"suite": suite, "name": name, "params": params,
+                            "us_per_call": round(seconds * 1e6, 3)}
+            print(f"{key:<60} {seconds * 1e6:12.2f} us")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print new/old time per case; returns the keys slower than the baseline
+    by more than tolerance (0.1 = 10%).
+    """
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = result["us_per_call"] / max(old["us_per_call"], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  SLOWER"
+            regressions.append(key)
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{key:<60} {old['us_per_call']:10.2f} -> "
+              f"{result['us_per_call']:10.2f} us  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn2Slither benchmarks")
+    parser.add_argument("-suite", action="append", choices=sorted(SUITES),
+                        help="Suite to run, repeatable (default: all)")
+    parser.add_argument("-filter", type=str, default=None,
+                        help="Only keep cases whose key contains this text")
+    parser.add_argument("-scale", type=int, default=1,
+                        help="Multiply the number of calls per case")
+    parser.add_argument("-out", type=str, default=None,
+                        help="Write the results to this JSON file")
+    parser.add_argument("-baseline", type=str, default=None,
+                        help="Compare against a JSON file written by -out")
+    parser.add_argument("-tolerance", type=float, default=0.10,
+                        help="Slowdown ratio counted as a regression \
+                            (default: 0.10)")
+    parser.add_argument("-startup_budget", type=float, default=None,
+                        help="Fail if a fresh 'import main' takes longer \
+                            than this many ms or loads pygame or \
+                            matplotlib (alone unless -suite is given)")
+    args = parser.parse_args()
+
+    if args.startup_budget is not None:
+        problems = check_startup(args.startup_budget)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        if not args.suite:
+            return
+
+    results = run(args.suite or list(SUITES), args.scale, args.filter)
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "scale": args.scale,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+import numpy as np
+
+
+class LRUPolicy:
+    # Evicts the entry written least recently
+    name = "lru"
+
+    def __init__(self):
+        self.order = OrderedDict()
+
+    def touch(self, key):
+        if key in self.order:
+            self.order.move_to_end(key)
+        else:
+            self.order[key] = None
+
+    def discard(self, key):
+        self.order.pop(key, None)
+
+    def evict(self, table):
+        return [self.order.popitem(last=False)[0]]
+
+
+class LeastVisitedPolicy:
+    """
+    Evicts the entry with the fewest updates (the oldest one on ties).
+
+    Keys sit in one insertion-ordered bucket per visit count, and the
+    smallest non-empty count is tracked, so touch and evict are O(1).
+    """
+    name = "visits"
+
+    def __init__(self):
+        self.counts = {}
+        self.buckets = {}
+        self.min_count = 0
+
+    def touch(self, key):
+        count = self.counts.get(key, 0)
+        if count:
+            self._unlink(key, count)
+            if self.min_count == count and count not in self.buckets:
+                self.min_count = count + 1
+        else:
+            self.min_count = 1
+        self.counts[key] = count + 1
+        self.buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def _unlink(self, key, count):
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+
+    def discard(self, key):
+        count = self.counts.pop(key, 0)
+        if count:
+            self._unlink(key, count)
+            if not self.buckets:
+                self.min_count = 0
+            elif self.min_count == count and count not in self.buckets:
+                self.min_count = min(self.buckets)
+
+    def evict(self, table):
+        # Only called right before a new key is touched, which resets
+        # min_count to 1, so an emptied bucket needs no rescan here
+        bucket = self.buckets[self.min_count]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self.buckets[self.min_count]
+        del self.counts[key]
+        return [key]
+
+
+class SmallestValuePolicy:
+    """
+    Evicts the entries with the smallest |Q|.
+
+    Values change on every update, so no order is kept: when the table is
+    full, one O(n) partition frees `fraction` of it at once, which is O(1)
+    amortized per inserted entry.
+    """
+    name = "value"
+
+    def __init__(self, fraction=1 / 16):
+        self.fraction = fraction
+
+    def touch(self, key):
+        pass
+
+    def discard(self, key):
+        pass
+
+    def evict(self, table):
+        keys = list(table)
+        count = max(1, int(len(keys) * self.fraction))
+        magnitudes = np.abs(np.fromiter(dict.values(table), dtype=np.float64,
+                                        count=len(keys)))
+        smallest = np.argpartition(magnitudes, count - 1)[:count]
+        return [keys[i] for i in smallest.tolist()]
+
+
+EVICTION_POLICIES = {
+    policy.name: policy
+    for policy in (LRUPolicy, LeastVisitedPolicy, SmallestValuePolicy)
+}
+
+
+def _restore(max_entries, policy, entries, evictions=0):
+    # Unpickle without replaying every entry through the policy
+    table = BoundedQTable(max_entries, policy)
+    dict.update(table, entries)
+    table.evictions = evictions
+    return table
+
+
+class BoundedQTable(dict):
+    """
+    Dict Q-table holding at most max_entries (state, action) entries.
+
+    Writing a new key to a full table first evicts entries chosen by the
+    policy ("lru", "visits" or "value", see EVICTION_POLICIES). Every
+    write counts as a visit; reads go straight to the dict, so
+    choose_action and update_q_value run at dict speed. Only [] and del
+    are tracked.
+    """
+
+    def __init__(self, max_entries, policy="lru", entries=()):
+        super().__init__()
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        if isinstance(policy, str):
+            policy = EVICTION_POLICIES[policy]()
+        self.policy = policy
+        self.evictions = 0
+        for key, value in dict(entries).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        if not dict.__contains__(self, key) and len(self) >= self.max_entries:
+            for victim in self.policy.evict(self):
+                dict.__delitem__(self, victim)
+                self.evictions += 1
+        dict.__setitem__(self, key, value)
+        self.policy.touch(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.policy.discard(key)
+
+    def __reduce__(self):
+        return _restore, (self.max_entries, self.policy, dict(self),
+                          self.evictions)
@@ -0,0 +1,30 @@
+import os
+import pickle
+from q_table_storage import atomic_open
+
+# Bumped whenever the checkpoint dict layout changes
+CHECKPOINT_VERSION = 3
+
+
+def save_checkpoint(filename, **state):
+    """
+    Atomically write a training checkpoint.
+
+    state holds everything train() needs to continue: the Q-table,
+    epsilon, the next episode, the grid size, RNG states and the metrics
+    state (rolling stats plus the length of the episode log at save time).
+    """
+    state["version"] = CHECKPOINT_VERSION
+    with atomic_open(filename) as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_checkpoint(filename):
+    # Returns the checkpoint dict, or None when there is no checkpoint yet
+    if not os.path.exists(filename):
+        return None
+    with open(filename, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {filename}")
+    return state
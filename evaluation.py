@@ -0,0 +1,193 @@
+import random
+import multiprocessing
+import signal
+import time
+import numpy as np
+from config import GRID_SIZE
+from q_algorithm import choose_action
+from snake_env import SnakeEnv
+from profiler import Profiler
+from trajectory import Trajectory
+
+# Exploration kept while evaluating, same as play()
+EVAL_EPSILON = 0.01
+
+# Table used by pool workers, set once by _init_worker
+_worker_q_table = None
+
+
+def play_game(q_table, seed, grid_size=GRID_SIZE, on_step=None,
+              profiler=None):
+    """
+    Play one headless game that depends only on seed; returns the env.
+
+    Both the board and the exploration draws of choose_action are seeded,
+    so the same seed always replays the same game. on_step(env, action) is
+    called before every move. A Profiler, if given, times the game.
+    """
+    random.seed(seed)
+    env = SnakeEnv(grid_size=grid_size, seed=seed)
+    choose = choose_action
+    if profiler is not None:
+        profiler.instrument(env)
+        choose = profiler.timed("choose_action", choose_action)
+    state = env.get_state()
+    done = False
+    while not done:
+        action = choose(state, EVAL_EPSILON, env.snake_dir, q_table)
+        if on_step is not None:
+            on_step(env, action)
+        _, _, done = env.step(action)
+        state = env.get_state()
+    if profiler is not None:
+        profiler.end_episode(env)
+    return env
+
+
+def death_cause(env):
+    # Why a finished game ended: "wall", "body" or "red apple"
+    head_x, head_y = env.snake[0]
+    if not (0 <= head_x < env.grid_size and 0 <= head_y < env.grid_size):
+        return "wall"
+    if env.snake_length <= 0:
+        return "red apple"
+    return "body"
+
+
+def play_headless(q_table, seed, grid_size=GRID_SIZE):
+    """
+    Play one seeded game at full speed; returns (result, trajectory).
+
+    result is a JSON-ready dict: final and best length, steps, death
+    cause and timings. Each step is timed from one decision to the next,
+    so it covers choose_action, the move and the new state. trajectory
+    holds the actions for a later replay.
+    """
+    trajectory = Trajectory(seed, grid_size)
+    step_times = []
+    best_length = [0]
+    clock = time.perf_counter
+    last = [None]
+
+    def on_step(env, action):
+        now = clock()
+        if last[0] is not None:
+            step_times.append(now - last[0])
+        last[0] = now
+        trajectory.record(action)
+        best_length[0] = max(best_length[0], env.snake_length)
+
+    start = clock()
+    env = play_game(q_table, seed, grid_size, on_step=on_step)
+    end = clock()
+    step_times.append(end - last[0])
+    step_us = np.array(step_times) * 1e6
+    result = {
+        "seed": seed,
+        "grid_size": grid_size,
+        "length": env.snake_length,
+        "max_length": max(best_length[0], env.snake_length),
+        "steps": env.steps,
+        "death": death_cause(env),
+        "seconds": end - start,
+        "steps_per_second": env.steps / (end - start),
+        "step_us": {
+            "mean": float(step_us.mean()),
+            "p50": float(np.percentile(step_us, 50)),
+            "p99": float(np.percentile(step_us, 99)),
+            "max": float(step_us.max()),
+        },
+    }
+    return result, trajectory
+
+
+def _init_worker(q_table):
+    global _worker_q_table
+    _worker_q_table = q_table
+    # Workers forked from the GUI inherit SDL's SIGTERM handler, which only
+    # queues a quit event; Pool.terminate needs them to exit
+    if multiprocessing.parent_process() is not None:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _play_seeds(args):
+    # Returns the (seed, length, steps) results and the chunk's Profiler
+    seeds, grid_size, profile = args
+    profiler = Profiler() if profile else None
+    results = []
+    for seed in seeds:
+        env = play_game(_worker_q_table, seed, grid_size, profiler=profiler)
+        results.append((seed, env.snake_length, env.steps))
+    return results, profiler
+
+
+def evaluate(q_table, num_games, workers=None, base_seed=0,
+             grid_size=GRID_SIZE, chunk_size=50, profiler=None,
+             on_progress=None, stop=None):
+    """
+    Play num_games seeded games over a process pool and summarize lengths.
+
+    Game i uses seed base_seed + i, so results do not depend on the number
+    of workers. The returned dict holds mean, median, percentiles, max and
+    the seed of the best game (the first one on ties). With a profiler,
+    the workers' phase timings are merged into it.
+
+    on_progress(results) is called with the (seed, length, steps) results
+    so far each time a chunk of games finishes. Once stop (a
+    threading.Event) is set, the remaining chunks are dropped and only the
+    games played so far are summarized; None if there are none.
+    """
+    seeds = list(range(base_seed, base_seed + num_games))
+    chunks = [(seeds[i:i + chunk_size], grid_size, profiler is not None)
+              for i in range(0, num_games, chunk_size)]
+    results = []
+
+    def collect(parts):
+        for part, part_profiler in parts:
+            results.extend(part)
+            if profiler is not None:
+                profiler.merge(part_profiler)
+            if on_progress is not None:
+                on_progress(results)
+            if stop is not None and stop.is_set():
+                return
+
+    if workers == 1:
+        _init_worker(q_table)
+        collect(_play_seeds(chunk) for chunk in chunks)
+    else:
+        # Leaving the with block terminates the workers of a stopped run
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(q_table,)) as pool:
+            collect(pool.imap(_play_seeds, chunks))
+    if not results:
+        return None
+    return summarize(results)
+
+
+def summarize(results):
+    # results: (seed, length, steps) per game
+    lengths = np.array([length for _, length, _ in results])
+    steps = np.array([s for _, _, s in results])
+    best = int(lengths.argmax())
+    p10, p25, p75, p90, p99 = np.percentile(lengths, [10, 25, 75, 90, 99])
+    return {
+        "games": len(results),
+        "mean": float(lengths.mean()),
+        "median": float(np.median(lengths)),
+        "p10": float(p10),
+        "p25": float(p25),
+        "p75": float(p75),
+        "p90": float(p90),
+        "p99": float(p99),
+        "max": int(lengths[best]),
+        "best_seed": results[best][0],
+        "mean_steps": float(steps.mean()),
+    }
+
+
+def format_report(stats):
+    return (f"{stats['games']} games: mean length {stats['mean']:.2f}, "
+            f"median {stats['median']:.1f}, p10 {stats['p10']:.1f}, "
+            f"p90 {stats['p90']:.1f}, p99 {stats['p99']:.1f}, "
+            f"max {stats['max']} (seed {stats['best_seed']})")
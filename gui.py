@@ -1,11 +1,12 @@
 import pygame
-from config import SCREEN_WIDTH, SCREEN_HEIGHT
+from config import GRID_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT
 from Scene import SceneManager
 from LobbyScene import LobbyScene
 
 
-def run_gui(q_table):
+def run_gui(q_table, grid_size=GRID_SIZE):
+    pygame.init()
     pygame.display.set_caption("Learn2Slither - Lobby")
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    mgr = SceneManager(LobbyScene(q_table))
+    mgr = SceneManager(LobbyScene(q_table, {"grid_size": grid_size}))
     mgr.run(screen, fps=60)
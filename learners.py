@@ -0,0 +1,138 @@
+import math
+from collections import deque
+from q_table_storage import DenseQTable
+from state_encoding import encode_state
+
+# Q(lambda) forgets a visit once its trace decays below this
+TRACE_CUTOFF = 0.01
+
+
+class Learner:
+    """
+    Multi-step Q-learning update used by train() instead of update_q_value.
+
+    update(state, action, reward, next_state, done) is called after every
+    move. Pending work is flushed when done is set, so a learner is ready
+    for the next episode without being reset. Dense tables are addressed
+    by encoded state index, dict tables by (state, action) keys.
+    """
+
+    def __init__(self, q_table, alpha, gamma):
+        self.q_table = q_table
+        self.alpha = alpha
+        self.gamma = gamma
+        if isinstance(q_table, DenseQTable):
+            self.values = q_table.values
+            self.grid_size = q_table.grid_size
+            self.key = self._dense_key
+            self.read = self._dense_read
+            self.write = self._dense_write
+            self.max_q = self._dense_max_q
+        else:
+            self.key = self._dict_key
+            self.read = self._dict_read
+            self.write = q_table.__setitem__
+            self.max_q = self._dict_max_q
+
+    def _dense_key(self, state, action):
+        return encode_state(state, self.grid_size), action
+
+    def _dense_read(self, key):
+        return self.values.item(key)
+
+    def _dense_write(self, key, value):
+        self.values[key] = value
+
+    def _dense_max_q(self, state):
+        return max(self.values[encode_state(state, self.grid_size)].tolist())
+
+    def _dict_key(self, state, action):
+        return tuple(state), action
+
+    def _dict_read(self, key):
+        return self.q_table.get(key, 0)
+
+    def _dict_max_q(self, state):
+        state = tuple(state)
+        return max(self.q_table.get((state, a), 0) for a in range(4))
+
+
+class NStepLearner(Learner):
+    """
+    n-step Q-learning: each (state, action) is backed up with the next n
+    rewards plus the discounted best Q-value n moves later, so an apple's
+    reward reaches n states back in one visit. At the end of an episode
+    the pending pairs are backed up with the rewards left, without
+    bootstrapping.
+    """
+
+    def __init__(self, q_table, alpha, gamma, n=2):
+        super().__init__(q_table, alpha, gamma)
+        self.n = n
+        self.discounts = [gamma ** i for i in range(n + 1)]
+        # (key, reward) of the last moves not yet backed up
+        self.pending = deque()
+
+    def _backup(self, bootstrap):
+        # Update the oldest pending pair from the rewards after it
+        pending = self.pending
+        discounts = self.discounts
+        target = sum(discounts[i] * reward
+                     for i, (_, reward) in enumerate(pending))
+        target += discounts[len(pending)] * bootstrap
+        key, _ = pending.popleft()
+        current = self.read(key)
+        self.write(key, current + self.alpha * (target - current))
+
+    def update(self, state, action, reward, next_state, done):
+        self.pending.append((self.key(state, action), reward))
+        if done:
+            while self.pending:
+                self._backup(0.0)
+        elif len(self.pending) == self.n:
+            self._backup(self.max_q(next_state))
+
+
+class QLambdaLearner(Learner):
+    """
+    Q(lambda) with accumulating eligibility traces.
+
+    Every TD error is applied to the recent visits of the episode, weighted
+    by (gamma * lambda) ** age. Visits are kept in a ring of the last few
+    moves only, since older ones have decayed below TRACE_CUTOFF, so an
+    update touches a bounded number of entries. Traces are not cut after
+    exploratory moves ("naive" Q(lambda)), which matters little at the
+    low epsilon train() decays to.
+    """
+
+    def __init__(self, q_table, alpha, gamma, lam=0.3):
+        super().__init__(q_table, alpha, gamma)
+        self.lam = lam
+        decay = gamma * lam
+        if 0 < decay < 1:
+            length = math.ceil(math.log(TRACE_CUTOFF) / math.log(decay))
+        else:
+            length = 1
+        # Weight of the trace at each age, newest visit first
+        self.weights = [decay ** age for age in range(length)]
+        self.visits = deque(maxlen=length)
+
+    def update(self, state, action, reward, next_state, done):
+        key = self.key(state, action)
+        target = reward
+        if not done:
+            target += self.gamma * self.max_q(next_state)
+        step = self.alpha * (target - self.read(key))
+        visits = self.visits
+        visits.appendleft(key)
+        read, write = self.read, self.write
+        for visit, weight in zip(visits, self.weights):
+            write(visit, read(visit) + step * weight)
+        if done:
+            visits.clear()
+
+
+LEARNERS = {
+    "nstep": NStepLearner,
+    "qlambda": QLambdaLearner,
+}
@@ -1,34 +1,40 @@
 #!/usr/bin/env python3
 
-import argparse
-import pickle
-from snake_game import train, play, play_multiple_games
-from collections import OrderedDict
-from gui import run_gui
+import os
+# Keep stdout clean for -headless JSON output
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 
-
-def load_q_table(filename):
-    try:
-        with open(filename, "rb") as f:
-            q_table = pickle.load(f)
-        # Convert to OrderedDict to maintain insertion order
-        return OrderedDict(q_table)
-    except FileNotFoundError:
-        return OrderedDict()
-
-
-def save_q_table(q_table, filename):
-    with open(filename, "wb") as f:
-        pickle.dump(q_table, f)
-    # print(f"Q-table saved to {filename}.")
+import argparse  # noqa: E402
+import json  # noqa: E402
+from snake_game import train, train_batch, play  # noqa: E402
+from snake_game import play_multiple_games  # noqa: E402
+from snake_game import replay_game, record_best_game  # noqa: E402
+from trajectory import load_trajectories, save_trajectories  # noqa: E402
+from q_table_storage import DenseQTable, MappedQTable  # noqa: E402
+from q_table_storage import load_q_table, save_q_table  # noqa: E402
+from q_table_storage import export_pickle  # noqa: E402
+from bounded_q_table import BoundedQTable, EVICTION_POLICIES  # noqa: E402
+from parallel_train import train_parallel, train_hogwild  # noqa: E402
+from checkpoint import load_checkpoint  # noqa: E402
+from config import GRID_SIZE  # noqa: E402
+from evaluation import evaluate, play_headless  # noqa: E402
+from metrics import plot_training_log  # noqa: E402
+from profiler import Profiler, format_profile  # noqa: E402
+from replay_buffer import ReplayBuffer  # noqa: E402
+from learners import LEARNERS  # noqa: E402
+from symmetry import SYMMETRIES, SymmetricQTable  # noqa: E402
 
 
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Learn2Slither:\
         Snake AI with Q-Learning")
-    parser.add_argument("-mode", choices=["train", "play"],
-                        required=True, help="Mode to run: 'train' or 'play'")
+    parser.add_argument("-mode", choices=["train", "play", "convert", "plot"],
+                        required=True, help="Mode to run: 'train', 'play', \
+                            'convert' (rewrite -load as -save: binary, \
+                            or a plain dict pickle if -save ends in .pkl) \
+                            or 'plot' (plot the \
+                            -log training log)")
     parser.add_argument("-sessions", type=int, default=1000,
                         help="Number of training episodes (default: 10)")
     parser.add_argument("-load", type=str, default="q_table.pkl",
@@ -41,33 +47,272 @@ def main():
                         help="Enable verbose output in play mode")
     parser.add_argument("-max", type=int, default=0,
                         help="Show max score game in play mode (default: 100)")
+    parser.add_argument("-dense", action="store_true",
+                        help="Use an array-backed Q-table (converts dict \
+                            tables on load)")
+    parser.add_argument("-batch", type=int, default=0,
+                        help="Train N boards at once with NumPy (implies \
+                            -dense)")
+    parser.add_argument("-workers", type=int, default=0,
+                        help="Worker processes for training (default: off) \
+                            and -max play mode (default: all cores)")
+    parser.add_argument("-sync", type=int, default=500,
+                        help="Episodes each worker plays between Q-table \
+                            merges (default: 500)")
+    parser.add_argument("-hogwild", action="store_true",
+                        help="With -workers, share one lock-free dense \
+                            Q-table between workers (implies -dense)")
+    parser.add_argument("-seed", type=int, default=0,
+                        help="Seed of the first game in -max play mode, \
+                            or of the -headless game (default: 0)")
+    parser.add_argument("-record", type=str, default=None,
+                        help="Save the best game of -max play mode, or \
+                            the -headless game, as a compact replay file")
+    parser.add_argument("-headless", action="store_true",
+                        help="Play mode without a window, at full speed; \
+                            prints the result (or the -max statistics) \
+                            as JSON. In train mode, no preview window")
+    parser.add_argument("-replay", type=str, default=None,
+                        help="Replay the games saved in a replay file")
+    parser.add_argument("-checkpoint", type=str, default=None,
+                        help="Checkpoint file for training (default: the \
+                            -save path + .ckpt)")
+    parser.add_argument("-checkpoint_every", type=int, default=0,
+                        help="Checkpoint single-process training every N \
+                            episodes (default: off)")
+    parser.add_argument("-checkpoint_seconds", type=float, default=None,
+                        help="Also checkpoint every T seconds")
+    parser.add_argument("-resume", action="store_true",
+                        help="Continue training from the checkpoint file")
+    parser.add_argument("-log", type=str, default=None,
+                        help="Training log (CSV) to write in train mode or \
+                            read in plot mode (default: a new file in \
+                            training_statistics/)")
+    parser.add_argument("-max_entries", type=int, default=0,
+                        help="Cap the dict Q-table at N entries, evicting \
+                            with -evict (default: no cap)")
+    parser.add_argument("-evict", choices=sorted(EVICTION_POLICIES),
+                        default="lru", help="Eviction policy for \
+                            -max_entries: least recently updated, least \
+                            visited or smallest |Q| (default: lru)")
+    parser.add_argument("-profile", action="store_true",
+                        help="Time each phase of train mode (single \
+                            process) and -max play mode, and print a \
+                            report every 10000 episodes and at the end")
+    parser.add_argument("-grid", type=int, default=None,
+                        help=f"Board size N (NxN cells; default: the \
+                            dense/binary table's size, else {GRID_SIZE})")
+    parser.add_argument("-buffer", type=int, default=0,
+                        help="Keep the last N transitions in a replay \
+                            buffer and replay a mini-batch after each \
+                            episode (implies -dense; default: off)")
+    parser.add_argument("-buffer_batch", type=int, default=256,
+                        help="Transitions replayed per episode with \
+                            -buffer (default: 256)")
+    parser.add_argument("-prioritized", action="store_true",
+                        help="With -buffer, sample transitions by TD error")
+    parser.add_argument("-learner", choices=["q"] + sorted(LEARNERS),
+                        default="q", help="Update rule for single-process \
+                            training: one-step Q-learning, n-step \
+                            Q-learning or Q(lambda) (default: q)")
+    parser.add_argument("-nstep", type=int, default=2,
+                        help="Rewards per backup with -learner nstep \
+                            (default: 2); larger n learns slower than \
+                            -learner q on this reward")
+    parser.add_argument("-lambda", type=float, default=0.3, dest="lam",
+                        help="Trace decay with -learner qlambda \
+                            (default: 0.3)")
+    parser.add_argument("-symmetry", type=int, choices=sorted(SYMMETRIES),
+                        default=None, help="Store one Q-table entry per \
+                            class of symmetric states: 4 (flips, exact for \
+                            the x-distance reward) or 8 (also rotations); \
+                            needs a new table or one saved with it")
     parser.add_argument("-g", "-gui", "--gui", dest="gui",
                         action="store_true", help="Launch GUI lobby")
 
     args = parser.parse_args()
+    if args.seed < 0:
+        # Replay files store seeds unsigned
+        parser.error("-seed must be at least 0")
+    for name in ("max", "workers", "batch", "max_entries"):
+        if getattr(args, name) < 0:
+            parser.error(f"-{name} must be at least 0")
+    if args.nstep < 1:
+        parser.error("-nstep must be at least 1")
+    if not 0 <= args.lam <= 1:
+        parser.error("-lambda must be between 0 and 1")
+
+    profiler = None
+    if args.profile:
+        profiler = Profiler(lambda summary: print(format_profile(summary)),
+                            every=10000)
+
+    if args.mode == "plot":
+        if args.log is None:
+            parser.error("-mode plot needs -log")
+        print(f"Statistics plot saved to {plot_training_log(args.log)}")
+        return
+
+    checkpoint = None
+    resume = None
+    if args.checkpoint_every or args.checkpoint_seconds or args.resume:
+        if args.mode == "train" and (args.batch or args.workers > 1):
+            parser.error("checkpoints work with single-process training \
+only")
+        checkpoint = args.checkpoint or args.save + ".ckpt"
+    if args.resume:
+        resume = load_checkpoint(checkpoint)
+        if resume is None:
+            print(f"No checkpoint at {checkpoint}, starting from scratch.")
 
-    q_table = load_q_table(args.load)
+    q_table = load_q_table(args.load) if resume is None \
+        else resume["q_table"]
+    symmetry = args.symmetry
+    if isinstance(q_table, SymmetricQTable):
+        saved = len(q_table.symmetries)
+        if symmetry not in (None, saved):
+            parser.error(f"{args.load} was trained with -symmetry {saved}")
+        symmetry = saved
+        # Converted below like any table, then wrapped again
+        q_table = q_table.table
+    elif symmetry and len(q_table):
+        parser.error("-symmetry needs a new Q-table or one saved with \
+-symmetry")
+    if symmetry and (args.batch or args.workers > 1 or args.buffer
+                     or args.learner != "q"):
+        parser.error("-symmetry works with single-process one-step \
+training only")
+    table_grid = getattr(q_table, "grid_size", None)
+    if resume is not None:
+        table_grid = resume["grid_size"]
+    if args.grid is not None and table_grid not in (None, args.grid):
+        parser.error(f"{args.load} holds a {table_grid}x{table_grid} \
+Q-table, not {args.grid}x{args.grid}")
+    grid_size = args.grid or table_grid or GRID_SIZE
+    if grid_size < 4:
+        parser.error("-grid must be at least 4")
+    dense = args.dense or args.batch or args.hogwild or args.buffer
+    if args.buffer and (args.batch or args.workers > 1):
+        parser.error("-buffer works with single-process training only")
+    if args.learner != "q" and (args.batch or args.workers > 1):
+        parser.error("-learner works with single-process training only")
+    if dense and grid_size > 99:
+        parser.error("dense Q-tables support grids up to 99x99")
+    if dense and args.max_entries:
+        parser.error("-max_entries needs a dict Q-table (no -dense, -batch \
+or -hogwild)")
+    if args.max_entries and args.mode == "train" and args.workers > 1:
+        # Workers read back every key they visited, evicted or not
+        parser.error("-max_entries works with single-process training only")
+    if dense and not isinstance(q_table, DenseQTable):
+        q_table = DenseQTable.from_dict(q_table, grid_size)
+    bounds = None
+    if isinstance(q_table, BoundedQTable):
+        bounds = (q_table.max_entries, q_table.policy.name)
+    if args.max_entries and bounds != (args.max_entries, args.evict):
+        # Rebuilding would lose the eviction order a resumed run relies on
+        if resume is not None and bounds is None:
+            parser.error(f"{checkpoint} holds an unbounded Q-table")
+        if resume is not None:
+            parser.error(f"{checkpoint} was trained with -max_entries \
+{bounds[0]} -evict {bounds[1]}")
+        q_table = BoundedQTable(args.max_entries, args.evict,
+                                q_table.items())
+    if symmetry:
+        q_table = SymmetricQTable(q_table, SYMMETRIES[symmetry])
 
-    if args.mode == "train":
+    if args.mode == "convert":
+        if args.save.endswith(".pkl"):
+            export_pickle(q_table, args.save)
+        else:
+            save_q_table(q_table, args.save, grid_size)
+    elif args.mode == "train":
+        if isinstance(q_table, MappedQTable):
+            q_table = q_table.to_dense()
         print(f"Training the AI for {args.sessions} episodes...")
         epsilon = 0.00  # Initial exploration rate for training
         alpha = 0.1    # Learning rate
         gamma = 0.9    # Discount factor
 
-        train(args.sessions, epsilon, alpha, gamma, q_table)
-        save_q_table(q_table, args.save)
+        if args.workers > 1 and args.hogwild:
+            train_hogwild(args.sessions, epsilon, alpha, gamma, q_table,
+                          args.workers,
+                          snapshot=lambda table: save_q_table(
+                              table, args.save, grid_size),
+                          log_path=args.log)
+        elif args.workers > 1:
+            train_parallel(args.sessions, epsilon, alpha, gamma, q_table,
+                           args.workers, sync_every=args.sync,
+                           log_path=args.log, grid_size=grid_size)
+        elif args.batch:
+            train_batch(args.sessions, epsilon, alpha, gamma, q_table,
+                        num_envs=args.batch, log_path=args.log)
+        else:
+            replay = None
+            if args.buffer:
+                replay = ReplayBuffer(args.buffer,
+                                      prioritized=args.prioritized)
+            learner = None
+            if args.learner == "nstep":
+                learner = LEARNERS["nstep"](q_table, alpha, gamma,
+                                            n=args.nstep)
+            elif args.learner == "qlambda":
+                learner = LEARNERS["qlambda"](q_table, alpha, gamma,
+                                              lam=args.lam)
+            train(args.sessions, epsilon, alpha, gamma, q_table,
+                  checkpoint=checkpoint,
+                  checkpoint_every=args.checkpoint_every,
+                  checkpoint_seconds=args.checkpoint_seconds,
+                  resume=resume, log_path=args.log, profiler=profiler,
+                  grid_size=grid_size, replay=replay,
+                  replay_batch=args.buffer_batch, learner=learner,
+                  render_every=None if args.headless else 10000)
+        save_q_table(q_table, args.save, grid_size)
+        if profiler is not None:
+            print(format_profile(profiler.summary()))
     elif args.mode == "play":
         if args.gui:
-            run_gui(q_table)
+            # Only the GUI needs pygame at startup
+            from gui import run_gui
+            run_gui(q_table, grid_size)
+            return
+        if args.replay:
+            for trajectory in load_trajectories(args.replay):
+                replay_game(trajectory)
+            return
+        if args.headless:
+            play_headless_mode(args, q_table, grid_size, profiler)
             return
         print("Starting the game...")
         if args.max:
             print("Showing max score games, it may takes a \
                   few seconds to find the max game...")
             play_multiple_games(q_table, verbose=args.verbose,
-                                num_games=args.max)
+                                num_games=args.max,
+                                workers=args.workers or None,
+                                base_seed=args.seed, record=args.record,
+                                profiler=profiler, grid_size=grid_size)
         else:
-            play(q_table, verbose=args.verbose)
+            play(q_table, verbose=args.verbose, grid_size=grid_size)
+
+
+def play_headless_mode(args, q_table, grid_size, profiler):
+    # Only the JSON result goes to stdout, for scripts
+    if args.max:
+        result = evaluate(q_table, args.max, workers=args.workers or None,
+                          base_seed=args.seed, grid_size=grid_size,
+                          profiler=profiler)
+        if profiler is not None:
+            result["profile"] = profiler.summary()
+        if args.record:
+            save_trajectories([record_best_game(q_table, result,
+                                                grid_size)], args.record)
+    else:
+        result, trajectory = play_headless(q_table, args.seed, grid_size)
+        if args.record:
+            save_trajectories([trajectory], args.record)
+    result["replay"] = args.record
+    print(json.dumps(result, indent=2))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+import os
+
+STATS_FOLDER = "training_statistics"
+LOG_HEADER = "episode,length,reward\n"
+
+
+class RollingStats:
+    """
+    Mean over the last `window` values in O(1) per value (ring buffer plus
+    running sum).
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.values = [0] * window
+        self.index = 0
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        self.total += value - self.values[self.index]
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+def unique_path(folder, filename):
+    # folder/filename, or folder/name_<n>.ext if it already exists
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, filename)
+    if os.path.exists(path):
+        base, ext = os.path.splitext(filename)
+        counter = 1
+        while os.path.exists(os.path.join(folder, f"{base}_{counter}{ext}")):
+            counter += 1
+        path = os.path.join(folder, f"{base}_{counter}{ext}")
+    return path
+
+
+class TrainingMetrics:
+    """
+    Per-episode training metrics.
+
+    Every episode is appended to a CSV log (episode,length,reward) instead
+    of being kept in memory; only the rolling averages over the last
+    `window` episodes and the max length live in RAM.
+    """
+
+    def __init__(self, log_path=None, window=1000):
+        self.log_path = log_path or unique_path(STATS_FOLDER,
+                                                "training_log.csv")
+        self.window = window
+        self.lengths = RollingStats(window)
+        self.rewards = RollingStats(window)
+        self.episodes = 0
+        self.max_length = 0
+        self.log = open(self.log_path, "w")
+        self.log.write(LOG_HEADER)
+
+    @classmethod
+    def from_state(cls, state):
+        # Continue a run saved by state(); later log lines are dropped
+        metrics = cls.__new__(cls)
+        metrics.__dict__.update(state)
+        os.truncate(metrics.log_path, state["log_offset"])
+        del metrics.log_offset
+        metrics.log = open(metrics.log_path, "a")
+        return metrics
+
+    def state(self):
+        self.log.flush()
+        state = {k: v for k, v in self.__dict__.items() if k != "log"}
+        state["log_offset"] = os.path.getsize(self.log_path)
+        return state
+
+    def record(self, length, reward):
+        self.episodes += 1
+        self.log.write(f"{self.episodes},{length},{reward}\n")
+        self.lengths.add(length)
+        self.rewards.add(reward)
+        if length > self.max_length:
+            self.max_length = length
+
+    def report(self, num_episodes):
+        avg_reward = self.rewards.mean()
+        avg_length = self.lengths.mean()
+        max_length = self.max_length
+        print(f"Episode {self.episodes}/{num_episodes} completed.\
+                  Average reward (last 1000 episodes): {avg_reward:.2f}.\
+                    Avg Length: {avg_length:.2f}. Max Length: {max_length}")
+
+    def close(self):
+        self.log.close()
+
+
+def read_lengths(log_path):
+    # Yields the snake length of every episode in a training log
+    with open(log_path) as f:
+        next(f, None)
+        for line in f:
+            yield int(line.split(",", 2)[1])
+
+
+def plot_training_log(log_path, image_path=None, window=1000,
+                      max_points=20000):
+    """
+    Plot max length and the moving average from a training log, headless.
+
+    The log is streamed in O(n) and only every step-th point is kept, so
+    at most about max_points points per curve are held and drawn. Returns
+    the path of the saved image.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    total = sum(1 for _ in read_lengths(log_path))
+    step = max(1, total // max_points)
+    rolling = RollingStats(window)
+    current_max = 0
+    episodes = []
+    moving_avg_length = []
+    max_lengths_over_time = []
+    for episode, length in enumerate(read_lengths(log_path)):
+        rolling.add(length)
+        current_max = max(current_max, length)
+        if episode % step == 0 or episode == total - 1:
+            episodes.append(episode)
+            moving_avg_length.append(rolling.mean())
+            max_lengths_over_time.append(current_max)
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(episodes, max_lengths_over_time,
+             label="Max Length Over Time", color="blue", linewidth=2)
+    plt.plot(episodes, moving_avg_length,
+             label=f"Moving Avg ({window} episodes)", color="orange",
+             linewidth=2)
+
+    # Add grid, labels, and legend
+    plt.grid(True, linestyle="--", alpha=0.5)
+    plt.xlabel("Episode")
+    plt.ylabel("Snake Length")
+    plt.title("Snake Length Statistics During Training")
+    plt.legend()
+    plt.tight_layout()
+
+    if image_path is None:
+        image_path = unique_path(STATS_FOLDER, "training_statistics.png")
+    plt.savefig(image_path)
+    plt.close()
+    return image_path
@@ -0,0 +1,229 @@
+import queue
+import random
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from config import GRID_SIZE
+from q_algorithm import choose_action, update_q_value
+from q_table_storage import DenseQTable
+from state_encoding import encode_state
+from snake_env import SnakeEnv
+from snake_game import prune_q_table
+from metrics import TrainingMetrics, plot_training_log
+
+
+def _table_key(q_table, state, action):
+    # Dense tables are merged by (row, action), dict tables by their key
+    if isinstance(q_table, DenseQTable):
+        return (encode_state(state, q_table.grid_size), action)
+    return (state, action)
+
+
+def _table_value(q_table, key):
+    if isinstance(q_table, DenseQTable):
+        return float(q_table.values[key])
+    return q_table[key]
+
+
+def _set_table_value(q_table, key, value):
+    if isinstance(q_table, DenseQTable):
+        q_table.values[key] = value
+    else:
+        q_table[key] = value
+
+
+def run_episode(env, epsilon, alpha, gamma, q_table, visits=None):
+    """
+    Play and learn from one headless episode; returns (length, reward).
+
+    When visits is a dict, it counts the updates made to each table key.
+    """
+    state = env.reset()
+    cumulative_reward = 0
+    while True:
+        action = choose_action(state, epsilon, env.snake_dir, q_table)
+        next_state, reward, done = env.step(action)
+        cumulative_reward += reward
+        update_q_value(state, action, reward, next_state,
+                       alpha, gamma, q_table)
+        if visits is not None:
+            key = _table_key(q_table, state, action)
+            visits[key] = visits.get(key, 0) + 1
+        if done:
+            return env.snake_length, cumulative_reward
+        state = env.get_state()
+
+
+def _train_shard(args):
+    # Worker: train a private copy of the table on its own RNG stream
+    q_table, episodes, epsilon, decay, alpha, gamma, seed, grid_size = args
+    random.seed(seed)
+    env = SnakeEnv(grid_size=grid_size, seed=seed)
+    visits = {}
+    lengths = []
+    rewards = []
+    for _ in range(episodes):
+        epsilon = max(0.01, epsilon * decay)
+        length, reward = run_episode(env, epsilon, alpha, gamma,
+                                     q_table, visits)
+        lengths.append(length)
+        rewards.append(reward)
+    updates = [(key, _table_value(q_table, key), count)
+               for key, count in visits.items()]
+    return updates, lengths, rewards
+
+
+def merge_updates(q_table, shard_updates):
+    """
+    Fold worker results into the master table.
+
+    Every key a worker touched becomes the average of the workers' values,
+    weighted by how many updates each worker made to it.
+    """
+    sums = {}
+    counts = {}
+    for updates in shard_updates:
+        for key, value, count in updates:
+            sums[key] = sums.get(key, 0.0) + value * count
+            counts[key] = counts.get(key, 0) + count
+    for key, total in sums.items():
+        _set_table_value(q_table, key, total / counts[key])
+
+
+def train_parallel(num_episodes, epsilon, alpha, gamma, q_table, workers,
+                   sync_every=500, seed=None, log_path=None,
+                   grid_size=GRID_SIZE):
+    """
+    Train with several worker processes, merging every round.
+
+    Each round every worker plays sync_every episodes from the current
+    master table, then the master merges their updates (see merge_updates).
+    Epsilon follows the same per-episode decay as train(), counted over
+    the episodes of all workers. Dense tables play on their own grid size.
+    """
+    grid_size = getattr(q_table, "grid_size", grid_size)
+    decay = 0.99995 ** workers
+    seeds = random.Random(seed)
+    metrics = TrainingMetrics(log_path)
+    episodes = 0
+    next_report = 1000
+
+    with multiprocessing.Pool(workers) as pool:
+        while episodes < num_episodes:
+            q_table = prune_q_table(q_table)
+            # The last round splits what is left, so no episode is extra
+            total = min(sync_every * workers, num_episodes - episodes)
+            shares = [total // workers + (i < total % workers)
+                      for i in range(workers)]
+            jobs = [(q_table, share, epsilon, decay, alpha, gamma,
+                     seeds.getrandbits(64), grid_size)
+                    for share in shares if share]
+            results = pool.map(_train_shard, jobs)
+            merge_updates(q_table, [updates for updates, _, _ in results])
+
+            for _, lengths, rewards in results:
+                for length, reward in zip(lengths, rewards):
+                    metrics.record(length, reward)
+            episodes += total
+            epsilon = max(0.01, epsilon * decay ** shares[0])
+
+            if episodes >= next_report:
+                metrics.report(num_episodes)
+                next_report = (episodes // 1000 + 1) * 1000
+
+    metrics.close()
+    print("Training completed!")
+    print(f"Statistics plot saved to {plot_training_log(metrics.log_path)}")
+
+
+def _hogwild_worker(shm_name, shape, grid_size, episodes, epsilon, decay,
+                    alpha, gamma, seed, results):
+    # Worker: learn straight into the shared table, without locks
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        q_table = DenseQTable(grid_size, values)
+        random.seed(seed)
+        env = SnakeEnv(grid_size=grid_size, seed=seed)
+        batch = []
+        for _ in range(episodes):
+            epsilon = max(0.01, epsilon * decay)
+            batch.append(run_episode(env, epsilon, alpha, gamma, q_table))
+            if len(batch) == 100:
+                results.put(batch)
+                batch = []
+        if batch:
+            results.put(batch)
+        del q_table, values
+    finally:
+        shm.close()
+
+
+def train_hogwild(num_episodes, epsilon, alpha, gamma, q_table, workers,
+                  snapshot=None, snapshot_every=60.0, seed=None,
+                  log_path=None):
+    """
+    Train a DenseQTable with workers sharing one table in shared memory.
+
+    Workers apply update_q_value directly to the shared array without
+    locking (Hogwild style): occasional lost updates on the same entry are
+    accepted in exchange for no per-step IPC. Only finished-episode stats
+    travel through a queue. Every snapshot_every seconds the parent passes
+    a copy of the table to snapshot(q_table), e.g. to save it to disk.
+    """
+    values = q_table.values
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    try:
+        shared = np.ndarray(values.shape, dtype=np.float32, buffer=shm.buf)
+        shared[:] = values
+        seeds = random.Random(seed)
+        decay = 0.99995 ** workers
+        results = multiprocessing.Queue()
+        shares = [num_episodes // workers + (i < num_episodes % workers)
+                  for i in range(workers)]
+        processes = [
+            multiprocessing.Process(
+                target=_hogwild_worker,
+                args=(shm.name, values.shape, q_table.grid_size, share,
+                      epsilon, decay, alpha, gamma, seeds.getrandbits(64),
+                      results))
+            for share in shares
+        ]
+        for process in processes:
+            process.start()
+
+        metrics = TrainingMetrics(log_path)
+        next_report = 1000
+        last_snapshot = time.monotonic()
+        while metrics.episodes < num_episodes:
+            try:
+                batch = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in processes):
+                    break
+                batch = []
+            for length, reward in batch:
+                metrics.record(length, reward)
+
+            episodes = metrics.episodes
+            if episodes >= next_report:
+                metrics.report(num_episodes)
+                next_report = (episodes // 1000 + 1) * 1000
+
+            if (snapshot is not None
+                    and time.monotonic() - last_snapshot >= snapshot_every):
+                snapshot(DenseQTable(q_table.grid_size, shared.copy()))
+                last_snapshot = time.monotonic()
+
+        metrics.close()
+        for process in processes:
+            process.join()
+        values[:] = shared
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+
+    print("Training completed!")
+    print(f"Statistics plot saved to {plot_training_log(metrics.log_path)}")
@@ -0,0 +1,120 @@
+import time
+from collections import Counter
+
+
+class Profiler:
+    """
+    Opt-in per-phase timers and counters for training and evaluation.
+
+    Phases are timed by wrapping the functions that implement them
+    (timed, instrument), so code that is not given a profiler runs the
+    unwrapped functions and pays nothing. After every episode,
+    end_episode counts steps and lengths; every `every` episodes it samples
+    the Q-table size and passes summary() to callback, if any.
+    """
+
+    # SnakeEnv methods timed by instrument()
+    ENV_PHASES = ("move_snake", "calculate_reward", "get_state",
+                  "check_collisions")
+
+    def __init__(self, callback=None, every=1000):
+        self.callback = callback
+        self.every = every
+        self.times = {}
+        self.calls = {}
+        self.episodes = 0
+        self.steps = 0
+        self.episode_steps = Counter()
+        self.episode_lengths = Counter()
+        self.table_sizes = []
+        self.start = time.perf_counter()
+
+    def timed(self, phase, fn):
+        # fn wrapped to add its run time to phase
+        times = self.times
+        calls = self.calls
+        times.setdefault(phase, 0.0)
+        calls.setdefault(phase, 0)
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            result = fn(*args, **kwargs)
+            times[phase] += clock() - start
+            calls[phase] += 1
+            return result
+        return wrapper
+
+    def instrument(self, env):
+        # Shadow the env's phase methods with timed ones, on this env only
+        for phase in self.ENV_PHASES:
+            setattr(env, phase, self.timed(phase, getattr(env, phase)))
+
+    def end_episode(self, env, q_table=None):
+        self.episodes += 1
+        self.steps += env.steps
+        self.episode_steps[env.steps] += 1
+        self.episode_lengths[env.snake_length] += 1
+        if self.every and self.episodes % self.every == 0:
+            if q_table is not None:
+                self.table_sizes.append((self.episodes, len(q_table)))
+            if self.callback is not None:
+                self.callback(self.summary())
+
+    def merge(self, other):
+        # Add the counts of another profiler, e.g. one from a pool worker
+        for phase, seconds in other.times.items():
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+            self.calls[phase] = self.calls.get(phase, 0) + other.calls[phase]
+        self.episodes += other.episodes
+        self.steps += other.steps
+        self.episode_steps.update(other.episode_steps)
+        self.episode_lengths.update(other.episode_lengths)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        phases = {
+            phase: {
+                "seconds": seconds,
+                "calls": self.calls[phase],
+                "us_per_call": (seconds / self.calls[phase] * 1e6
+                                if self.calls[phase] else 0.0),
+            }
+            for phase, seconds in self.times.items()
+        }
+        return {
+            "elapsed": elapsed,
+            "episodes": self.episodes,
+            "steps": self.steps,
+            "steps_per_second": self.steps / elapsed if elapsed else 0.0,
+            "phases": phases,
+            "episode_steps": dict(sorted(self.episode_steps.items())),
+            "episode_lengths": dict(sorted(self.episode_lengths.items())),
+            "table_sizes": list(self.table_sizes),
+        }
+
+    def __getstate__(self):
+        # Callbacks may not pickle; workers send back counts only
+        state = self.__dict__.copy()
+        state["callback"] = None
+        return state
+
+
+def format_profile(summary):
+    lines = [f"{summary['episodes']} episodes, {summary['steps']} steps in "
+             f"{summary['elapsed']:.2f}s "
+             f"({summary['steps_per_second']:.0f} steps/s)"]
+    phases = sorted(summary["phases"].items(),
+                    key=lambda item: item[1]["seconds"], reverse=True)
+    for phase, stats in phases:
+        lines.append(f"  {phase:<18} {stats['seconds']:9.3f}s "
+                     f"{stats['calls']:>10} calls "
+                     f"{stats['us_per_call']:8.2f} us/call")
+    lengths = summary["episode_lengths"]
+    if lengths:
+        lines.append("  snake length: " + ", ".join(
+            f"{length}x{count}" for length, count in lengths.items()))
+    if summary["table_sizes"]:
+        episode, size = summary["table_sizes"][-1]
+        lines.append(f"  Q-table size: {size} entries at episode {episode}")
+    return "\n".join(lines)
@@ -1,8 +1,20 @@
 import random
 from config import GRID_SIZE
+from q_table_storage import DenseQTable
+from symmetry import SymmetricQTable
+from vision import cells_mask, state_from_masks
 
 
 def choose_action(state, epsilon, current_dir, q_table):
+    if isinstance(q_table, SymmetricQTable):
+        # Choose in the canonical frame, then map the action back
+        state, symmetry = q_table.canonical(state)
+        action = choose_action(
+            state, epsilon,
+            q_table.canonical_direction(current_dir, symmetry),
+            q_table.table)
+        return symmetry.index(action)
+
     directions = {
         0: (0, -1),  # Up
         1: (0, 1),   # Down
@@ -18,6 +30,10 @@ def choose_action(state, epsilon, current_dir, q_table):
 
     if random.uniform(0, 1) < epsilon:
         return random.choice(valid_actions)
+    elif isinstance(q_table, DenseQTable):
+        # One row read, then the best valid action (first one on ties)
+        q_row = q_table.row(state).tolist()
+        return max(valid_actions, key=q_row.__getitem__)
     else:
         # Fetch Q-values for valid actions
         q_values = {a: q_table.get((state, a), 0) for a in valid_actions}
@@ -28,6 +44,17 @@ def choose_action(state, epsilon, current_dir, q_table):
 
 
 def update_q_value(state, action, reward, next_state, alpha, gamma, q_table):
+    if isinstance(q_table, SymmetricQTable):
+        state, symmetry = q_table.canonical(state)
+        next_state, _ = q_table.canonical(next_state)
+        update_q_value(state, symmetry[action], reward, next_state,
+                       alpha, gamma, q_table.table)
+        return
+
+    if isinstance(q_table, DenseQTable):
+        q_table.update(state, action, reward, next_state, alpha, gamma)
+        return
+
     # Normalize the state and next state
     state = tuple(state)  # Ensure the state is hashable
     next_state = tuple(next_state)
@@ -46,9 +73,19 @@ def normalize(value, grid_size):
     return round(value / grid_size, 2)
 
 
-def get_state(snake, green_apples, red_apple):
+def get_state(snake, green_apples, red_apple, grid_size=GRID_SIZE):
     head_x, head_y = snake[0]
 
+    if 0 <= head_x < grid_size and 0 <= head_y < grid_size:
+        # Bitboards against the precomputed rays: O(length), not O(size * len)
+        red_mask = cells_mask([red_apple], grid_size) if red_apple else 0
+        return state_from_masks(head_y * grid_size + head_x,
+                                cells_mask(snake, grid_size),
+                                cells_mask(green_apples, grid_size),
+                                red_mask, grid_size)
+
+    # A head off the board (only after a wall hit) walks the rays
+
     def check_direction(dx, dy):
         distance = 0
         apple_nearby = False
@@ -58,7 +95,7 @@ def get_state(snake, green_apples, red_apple):
         x, y = head_x + dx, head_y + dy
         while True:
             distance += 1
-            if x < 0 or y < 0 or x >= GRID_SIZE or y >= GRID_SIZE:
+            if x < 0 or y < 0 or x >= grid_size or y >= grid_size:
                 break
             if (x, y) in green_apples:
                 apple_nearby = True
@@ -70,7 +107,7 @@ def get_state(snake, green_apples, red_apple):
             y += dy
 
         return (
-            normalize(distance, GRID_SIZE),
+            normalize(distance, grid_size),
             apple_nearby,
             red_apple_nearby,
             body_nearby
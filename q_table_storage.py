@@ -1 +1,258 @@
-q_table = {}  # Initialize an empty Q-table
\ No newline at end of file
+import os
+import pickle
+import struct
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+from config import GRID_SIZE
+from state_encoding import (
+    FLAG_BITS,
+    num_states,
+    terminal_index,
+    encode_state,
+    decode_state,
+)
+
+
+class DenseQTable:
+    """
+    Q-table stored as a contiguous float32[num_states, 4] array.
+
+    Rows are indexed by encode_state, so reading the Q-values of a state is
+    one row lookup. The dict-style get/[]/items interface is kept so code
+    written for the dict tables (and prune_q_table) keeps working.
+    """
+
+    def __init__(self, grid_size=GRID_SIZE, values=None):
+        self.grid_size = grid_size
+        if values is None:
+            values = np.zeros((num_states(grid_size), 4), dtype=np.float32)
+        self.values = values
+
+    @classmethod
+    def from_dict(cls, q_table, grid_size=GRID_SIZE):
+        # Convert a {(state, action): q} table, e.g. the test_max_*.pkl files
+        table = cls(grid_size)
+        for (state, action), value in q_table.items():
+            index = encode_state(state, grid_size)
+            if index != terminal_index(grid_size):
+                table.values[index, action] = value
+        return table
+
+    def row(self, state):
+        return self.values[encode_state(state, self.grid_size)]
+
+    def update(self, state, action, reward, next_state, alpha, gamma):
+        values = self.values
+        index = encode_state(state, self.grid_size)
+        max_next_q = max(values[encode_state(next_state,
+                                             self.grid_size)].tolist())
+        current_q = values.item(index, action)
+        values[index, action] = current_q + alpha * (
+            reward + gamma * max_next_q - current_q)
+
+    def prune(self, threshold=0.01):
+        self.values[np.abs(self.values) < threshold] = 0.0
+
+    def get(self, key, default=0):
+        state, action = key
+        index = encode_state(state, self.grid_size)
+        if index == terminal_index(self.grid_size):
+            return default
+        return float(self.values[index, action])
+
+    def __getitem__(self, key):
+        state, action = key
+        return float(self.values[encode_state(state, self.grid_size), action])
+
+    def __setitem__(self, key, value):
+        state, action = key
+        index = encode_state(state, self.grid_size)
+        if index == terminal_index(self.grid_size):
+            raise KeyError(key)
+        self.values[index, action] = value
+
+    def __delitem__(self, key):
+        self[key] = 0.0
+
+    def __contains__(self, key):
+        return self.get(key, 0) != 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.values))
+
+    def items(self):
+        indices, actions = np.nonzero(self.values)
+        for index, action in zip(indices.tolist(), actions.tolist()):
+            yield ((decode_state(index, self.grid_size), action),
+                   float(self.values[index, action]))
+
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+
+
+# Binary Q-table file:
+#   header:  magic, version, grid size, flag bits, actions, row count
+#   index:   uint32[count], sorted encoded states that have a row
+#   values:  float32[count, actions]
+# The arrays are used in place through np.memmap.
+MAGIC = b"L2SQ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHQ")
+
+
+class MappedQTable(DenseQTable):
+    """
+    Read-only Q-table backed by a memory-mapped binary file.
+
+    Opening it only reads the header; rows are found by binary search in
+    the sorted state index. Pickling it (e.g. for pool workers) sends the
+    file name, so every process maps the same pages.
+    """
+
+    def __init__(self, filename, grid_size, index, values):
+        self.filename = filename
+        self.grid_size = grid_size
+        self.index = index
+        self.values = values
+        self._zero_row = np.zeros(values.shape[1], dtype=np.float32)
+
+    def __reduce__(self):
+        return (load_mapped, (self.filename,))
+
+    def _find(self, encoded):
+        i = int(np.searchsorted(self.index, encoded))
+        if i < len(self.index) and self.index[i] == encoded:
+            return i
+        return -1
+
+    def row(self, state):
+        i = self._find(encode_state(state, self.grid_size))
+        return self.values[i] if i >= 0 else self._zero_row
+
+    def to_dense(self):
+        table = DenseQTable(self.grid_size)
+        table.values[np.asarray(self.index)] = self.values
+        return table
+
+    def update(self, *args):
+        raise TypeError("MappedQTable is read-only, use to_dense()")
+
+    def prune(self, threshold=0.01):
+        raise TypeError("MappedQTable is read-only, use to_dense()")
+
+    def get(self, key, default=0):
+        state, action = key
+        i = self._find(encode_state(state, self.grid_size))
+        return float(self.values[i, action]) if i >= 0 else default
+
+    def __getitem__(self, key):
+        return self.get(key, 0.0)
+
+    def __setitem__(self, key, value):
+        raise TypeError("MappedQTable is read-only, use to_dense()")
+
+    def items(self):
+        for i, encoded in enumerate(self.index.tolist()):
+            for action, value in enumerate(self.values[i].tolist()):
+                if value != 0:
+                    yield (decode_state(encoded, self.grid_size),
+                           action), value
+
+
+@contextmanager
+def atomic_open(filename):
+    """
+    Open filename for binary writing; the file is only replaced (by an
+    atomic rename) once everything was written, so readers and crashes
+    never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def load_mapped(filename):
+    with open(filename, "rb") as f:
+        header = f.read(HEADER.size)
+    magic, version, grid_size, flag_bits, actions, count = \
+        HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a binary Q-table")
+    if version != VERSION or flag_bits != FLAG_BITS:
+        raise ValueError(f"Unsupported Q-table format in {filename}")
+    if count == 0:
+        return MappedQTable(filename, grid_size,
+                            np.zeros(0, dtype=np.uint32),
+                            np.zeros((0, actions), dtype=np.float32))
+    index = np.memmap(filename, dtype=np.uint32, mode="r",
+                      offset=HEADER.size, shape=(count,))
+    values = np.memmap(filename, dtype=np.float32, mode="r",
+                       offset=HEADER.size + index.nbytes,
+                       shape=(count, actions))
+    return MappedQTable(filename, grid_size, index, values)
+
+
+def save_binary(q_table, filename, grid_size=GRID_SIZE):
+    # Accepts dict, dense and mapped tables; only non-zero rows are written
+    if not isinstance(q_table, DenseQTable):
+        q_table = DenseQTable.from_dict(q_table, grid_size)
+    if isinstance(q_table, MappedQTable):
+        index = np.asarray(q_table.index, dtype=np.uint32)
+        values = np.asarray(q_table.values, dtype=np.float32)
+    else:
+        index = np.flatnonzero(q_table.values.any(axis=1)).astype(np.uint32)
+        values = q_table.values[index]
+    with atomic_open(filename) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, q_table.grid_size, FLAG_BITS,
+                            values.shape[1], len(index)))
+        f.write(index.tobytes())
+        f.write(np.ascontiguousarray(values).tobytes())
+
+
+def is_binary(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_q_table(filename):
+    """
+    Load a Q-table: binary files are memory-mapped, anything else is read
+    as a pickle (dict or DenseQTable). A missing file gives an empty dict.
+    """
+    try:
+        if is_binary(filename):
+            return load_mapped(filename)
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_q_table(q_table, filename, grid_size=GRID_SIZE):
+    # .pkl keeps the pickle format, any other name gets the binary format;
+    # grid_size is the board a dict table was trained on
+    if filename.endswith(".pkl"):
+        if isinstance(q_table, MappedQTable):
+            q_table = q_table.to_dense()
+        with atomic_open(filename) as f:
+            pickle.dump(q_table, f)
+    else:
+        save_binary(q_table, filename, grid_size)
+
+
+def export_pickle(q_table, filename):
+    # Plain {(state, action): q} pickle, readable by the original code
+    with atomic_open(filename) as f:
+        pickle.dump(dict(q_table.items()), f)
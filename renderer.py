@@ -0,0 +1,224 @@
+from functools import lru_cache
+import pygame
+from config import (
+    CELL_SIZE,
+    SCREEN_SIZE,
+    BACKGROUND_COLOR,
+    SNAKE_COLOR,
+    SNAKE_EYE_COLOR,
+    APPLE_GREEN_COLOR,
+    APPLE_RED_COLOR,
+)
+
+PANEL_WIDTH = 200
+PANEL_COLOR = (40, 40, 40)
+TEXT_COLOR = (255, 255, 255)
+CHECKER_COLORS = ((100, 149, 237), (70, 130, 180))
+# Mini board of the right panel
+MINI_PADDING = 10
+HIDDEN_COLOR = (15, 15, 15)   # Fully hidden
+VISION_BG_COLOR = (65, 65, 65)
+HEAD_COLOR = (0, 255, 0)
+OUTLINE_COLOR = (200, 200, 200)
+
+# Cell kinds of the main board, by drawing priority (apples on top)
+BODY, HEAD, GREEN, RED = range(4)
+KIND_COLORS = {BODY: SNAKE_COLOR, HEAD: SNAKE_COLOR,
+               GREEN: APPLE_GREEN_COLOR, RED: APPLE_RED_COLOR}
+
+
+def cell_size(grid_size):
+    # Pixels per cell; boards of any size fit in the same window
+    return max(1, min(CELL_SIZE, SCREEN_SIZE // grid_size))
+
+
+def mini_cell_size(grid_size):
+    return max(1, (PANEL_WIDTH - 2 * MINI_PADDING) // grid_size)
+
+
+@lru_cache(maxsize=None)
+def font(size):
+    return pygame.font.Font(None, size)
+
+
+@lru_cache(maxsize=512)
+def text(message, size, color=TEXT_COLOR):
+    # Rendered text, kept for the next frames that show the same string
+    return font(size).render(message, True, color)
+
+
+@lru_cache(maxsize=8)
+def background(grid_size, width, height):
+    """
+    Everything that never changes during a game: the checkerboard, the
+    right panel, the fully hidden mini board and the separator line.
+    """
+    surface = pygame.Surface((width, height)).convert()
+    surface.fill(BACKGROUND_COLOR)
+    cell = cell_size(grid_size)
+    for y in range(grid_size):
+        for x in range(grid_size):
+            pygame.draw.rect(surface, CHECKER_COLORS[(x + y) % 2],
+                             (x * cell, y * cell, cell, cell))
+
+    pygame.draw.rect(surface, PANEL_COLOR,
+                     (SCREEN_SIZE, 0, PANEL_WIDTH, height))
+    mini = mini_cell_size(grid_size)
+    origin = SCREEN_SIZE + MINI_PADDING
+    for y in range(grid_size):
+        for x in range(grid_size):
+            pygame.draw.rect(surface, HIDDEN_COLOR,
+                             _mini_rect(origin, mini, (x, y)))
+    pygame.draw.rect(surface, OUTLINE_COLOR,
+                     (origin - 2, MINI_PADDING - 2,
+                      grid_size * mini + 3, grid_size * mini + 3), 2)
+    pygame.draw.line(surface, TEXT_COLOR,
+                     (SCREEN_SIZE, 0), (SCREEN_SIZE, height), 2)
+    return surface
+
+
+def _mini_rect(origin, mini, cell):
+    return pygame.Rect(origin + cell[0] * mini, MINI_PADDING + cell[1] * mini,
+                       max(1, mini - 1), max(1, mini - 1))
+
+
+class BoardRenderer:
+    """
+    Draws SnakeEnv frames, repainting only what changed.
+
+    The static parts come from a cached background surface. Each frame
+    the cells of the main and mini boards are compared with the previous
+    frame; only cells whose content changed are repainted, and only their
+    rects (plus the panel text) are sent to pygame.display.update. Call
+    invalidate() after anything else draws on the screen.
+    """
+
+    def __init__(self, screen, grid_size):
+        self.screen = screen
+        self.grid_size = grid_size
+        self.cell = cell_size(grid_size)
+        self.mini = mini_cell_size(grid_size)
+        self.mini_origin = SCREEN_SIZE + MINI_PADDING
+        # Inside of the mini board outline, which covers the last cells
+        # of boards with 1 pixel mini cells
+        self.mini_area = pygame.Rect(self.mini_origin, MINI_PADDING,
+                                     self.mini * grid_size - 1,
+                                     self.mini * grid_size - 1)
+        width, height = screen.get_size()
+        self.background = background(grid_size, width, height)
+        # Panel text goes under the mini board
+        text_y = 10 + 10 + self.mini * grid_size + 20
+        self.text_rect = pygame.Rect(SCREEN_SIZE + 2, text_y,
+                                     width - SCREEN_SIZE - 2, height - text_y)
+        self.invalidate()
+
+    def invalidate(self):
+        self.board = {}
+        self.mini_board = {}
+        self.full = True
+
+    def _board_cells(self, env):
+        # {cell: kind} of the main board, apples over the snake
+        grid_size = self.grid_size
+        cells = {}
+        for segment in env.snake:
+            cells[segment] = BODY
+        cells[env.snake[0]] = HEAD
+        for apple in env.green_apples:
+            cells[apple] = GREEN
+        if env.red_apple is not None:
+            cells[env.red_apple] = RED
+        return {cell: kind for cell, kind in cells.items()
+                if 0 <= cell[0] < grid_size and 0 <= cell[1] < grid_size}
+
+    def _mini_cells(self, env):
+        # {cell: color} of the mini board cells the snake can see
+        head = env.snake[0]
+        visible = env.vision_cells()
+        grid_size = self.grid_size
+        if 0 <= head[0] < grid_size and 0 <= head[1] < grid_size:
+            visible.add(head)
+        greens = set(env.green_apples)
+        cells = {}
+        for cell in visible:
+            if cell == head:
+                color = HEAD_COLOR
+            elif env.is_body(cell):
+                color = SNAKE_COLOR
+            elif cell in greens:
+                color = APPLE_GREEN_COLOR
+            elif cell == env.red_apple:
+                color = APPLE_RED_COLOR
+            else:
+                color = VISION_BG_COLOR
+            cells[cell] = color
+        return cells
+
+    def _draw_cell(self, cell, kind):
+        size = self.cell
+        rect = pygame.Rect(cell[0] * size, cell[1] * size, size, size)
+        pygame.draw.rect(self.screen, KIND_COLORS[kind], rect)
+        if kind == HEAD:  # Draw googly eyes on the head
+            eye_radius = size // 8
+            eye_offset = size // 4
+            pygame.draw.circle(self.screen, SNAKE_EYE_COLOR,
+                               (rect.x + eye_offset, rect.y + eye_offset),
+                               eye_radius)
+            pygame.draw.circle(self.screen, SNAKE_EYE_COLOR,
+                               (rect.right - eye_offset, rect.y + eye_offset),
+                               eye_radius)
+        return rect
+
+    def _mini_rect(self, cell):
+        return _mini_rect(self.mini_origin, self.mini, cell).clip(
+            self.mini_area)
+
+    def _restore(self, rect):
+        self.screen.blit(self.background, rect, rect)
+        return rect
+
+    def draw(self, env, start_ticks=0, moves=()):
+        screen = self.screen
+        board = self._board_cells(env)
+        mini_board = self._mini_cells(env)
+        dirty = []
+        if self.full:
+            screen.blit(self.background, (0, 0))
+        size = self.cell
+
+        for cell in self.board.keys() - board.keys():
+            dirty.append(self._restore(
+                pygame.Rect(cell[0] * size, cell[1] * size, size, size)))
+        for cell, kind in board.items():
+            if self.board.get(cell) != kind:
+                dirty.append(self._draw_cell(cell, kind))
+
+        for cell in self.mini_board.keys() - mini_board.keys():
+            dirty.append(self._restore(self._mini_rect(cell)))
+        for cell, color in mini_board.items():
+            if self.mini_board.get(cell) != color:
+                rect = self._mini_rect(cell)
+                pygame.draw.rect(screen, color, rect)
+                dirty.append(rect)
+
+        dirty.append(self._restore(self.text_rect))
+        self._draw_text(env, start_ticks, moves)
+
+        self.board = board
+        self.mini_board = mini_board
+        if self.full:
+            self.full = False
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        return dirty
+
+    def _draw_text(self, env, start_ticks, moves):
+        x = SCREEN_SIZE + 10
+        y = self.text_rect.y
+        # Elapsed time in seconds
+        elapsed_sec = max(0, (pygame.time.get_ticks() - start_ticks) / 1000.0)
+        self.screen.blit(text(f"Length: {env.snake_length}", 26), (x, y))
+        self.screen.blit(text(f"Time: {elapsed_sec:.1f}s", 26), (x, y + 28))
+        for i, move in enumerate(moves[-5:]):
+            self.screen.blit(text(f"{move}", 26), (x + 10, y + 55 + i * 22))
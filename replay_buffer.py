@@ -0,0 +1,92 @@
+import numpy as np
+
+# Keeps transitions with a zero TD error sampleable
+PRIORITY_EPSILON = 1e-3
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring of transitions stored in preallocated arrays.
+
+    States are kept as their encode_state index, so a mini-batch of
+    tabular Q-learning updates is a few fancy-indexing operations on a
+    DenseQTable's values. Unlike update_q_value, replayed targets of final
+    transitions do not bootstrap from the next state.
+
+    With prioritized=True, transitions are drawn with probability
+    proportional to (|TD error| + PRIORITY_EPSILON) ** priority, new ones
+    at the highest priority seen so far, and updates are scaled by the
+    importance-sampling weights (N * P) ** -beta.
+    """
+
+    def __init__(self, capacity, prioritized=False, priority=0.6, beta=0.4,
+                 seed=None):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.prioritized = prioritized
+        self.priority = priority
+        self.beta = beta
+        if prioritized:
+            self.priorities = np.zeros(capacity, dtype=np.float64)
+            self.max_priority = 1.0
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self.position = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        # state and next_state are encode_state indexes
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        if self.prioritized:
+            self.priorities[i] = self.max_priority
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        # (indices, importance-sampling weights or None)
+        if not self.prioritized:
+            return self.rng.integers(0, self.size, size=batch_size), None
+        cumulative = np.cumsum(self.priorities[:self.size])
+        total = cumulative[-1]
+        indices = np.searchsorted(
+            cumulative, self.rng.random(batch_size) * total, side="right")
+        indices = np.minimum(indices, self.size - 1)
+        probabilities = self.priorities[indices] / total
+        weights = (self.size * probabilities) ** -self.beta
+        return indices, weights / weights.max()
+
+    def replay(self, values, batch_size, alpha, gamma):
+        """
+        Apply one mini-batch of Q-learning updates to values in place.
+
+        When a batch holds the same (state, action) more than once, the
+        last write wins, as in train_batch. Returns the TD errors.
+        """
+        if self.size == 0:
+            return np.zeros(0)
+        indices, weights = self.sample(batch_size)
+        states = self.states[indices]
+        actions = self.actions[indices]
+        max_next = values[self.next_states[indices]].max(axis=1)
+        targets = self.rewards[indices] + gamma * np.where(
+            self.dones[indices], 0.0, max_next)
+        current = values[states, actions]
+        errors = targets - current
+        steps = alpha * errors if weights is None else alpha * weights * errors
+        values[states, actions] = current + steps
+        if self.prioritized:
+            priorities = (np.abs(errors) + PRIORITY_EPSILON) ** self.priority
+            self.priorities[indices] = priorities
+            self.max_priority = max(self.max_priority, priorities.max())
+        return errors
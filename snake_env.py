@@ -0,0 +1,264 @@
+import random
+from collections import deque
+from config import GRID_SIZE
+from q_algorithm import get_state, action_to_direction
+from vision import state_from_masks
+
+
+DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]  # Up, Down, Left, Right
+
+
+def init_snake(rng, grid_size=GRID_SIZE, length=3):
+    dx, dy = rng.choice(DIRECTIONS)
+    if dx == 1:        # moving right, body extends left
+        min_x = length - 1
+        max_x = grid_size - 1
+    elif dx == -1:     # moving left, body extends right
+        min_x = 0
+        max_x = grid_size - length
+    else:              # vertical movement, any x
+        min_x = 0
+        max_x = grid_size - 1
+
+    if dy == 1:        # moving down, body extends up
+        min_y = length - 1
+        max_y = grid_size - 1
+    elif dy == -1:     # moving up, body extends down
+        min_y = 0
+        max_y = grid_size - length
+    else:              # horizontal movement, any y
+        min_y = 0
+        max_y = grid_size - 1
+
+    head_x = rng.randint(min_x, max_x)
+    head_y = rng.randint(min_y, max_y)
+
+    # Body segments placed opposite movement direction
+    snake = [(head_x, head_y)]
+    for i in range(1, length):
+        snake.append((head_x - dx * i, head_y - dy * i))
+    return snake, (dx, dy), length
+
+
+class SnakeEnv:
+    """
+    Self-contained, headless Snake game.
+
+    All game state lives on the instance, so any number of environments can
+    run side by side in one process. Nothing here touches pygame.
+    """
+
+    def __init__(self, grid_size=GRID_SIZE, seed=None, num_green=2):
+        self.grid_size = grid_size
+        self.num_green = num_green
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        snake, self.snake_dir, self.snake_length = init_snake(
+            self.rng, self.grid_size)
+        self._set_body(snake)
+        self.green_apples = []
+        self.red_apple = None
+        for _ in range(self.num_green):
+            self._place_green(self._random_empty_cell())
+        self._place_red(self._random_empty_cell())
+        self.done = False
+        self.steps = 0
+        return self.get_state()
+
+    def get_state(self):
+        head_x, head_y = self.snake[0]
+        grid_size = self.grid_size
+        if 0 <= head_x < grid_size and 0 <= head_y < grid_size:
+            return state_from_masks(head_y * grid_size + head_x,
+                                    self.body_mask, self.green_mask,
+                                    self.red_mask, grid_size)
+        return get_state(self.snake, self.green_apples, self.red_apple,
+                         grid_size)
+
+    def _set_body(self, snake):
+        # The body is a deque (head first) plus per-cell segment counts and
+        # a bitboard of occupied cells (bit y * grid_size + x). Moves touch
+        # only the head and tail, so a step costs the same at any length.
+        cells = self.grid_size * self.grid_size
+        self.snake = deque(snake)
+        self.occupancy = bytearray(cells)
+        self.body_mask = 0
+        self.green_mask = 0
+        self.red_mask = 0
+        # Cells holding neither a segment nor an apple, as a swap-remove
+        # array plus each cell's position in it (-1 once taken), so a random
+        # empty cell is a single index
+        self.free_cells = list(range(cells))
+        self.free_pos = list(range(cells))
+        for cell in self.snake:
+            self._add_segment(cell)
+
+    def _add_segment(self, cell):
+        x, y = cell
+        if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+            index = y * self.grid_size + x
+            if not self.occupancy[index]:
+                self._take(index)
+            self.occupancy[index] += 1
+            self.body_mask |= 1 << index
+
+    def _remove_segment(self, cell):
+        x, y = cell
+        if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+            index = y * self.grid_size + x
+            self.occupancy[index] -= 1
+            if not self.occupancy[index]:
+                self.body_mask &= ~(1 << index)
+                if not (self.green_mask | self.red_mask) >> index & 1:
+                    self._release(index)
+
+    def _take(self, index):
+        pos = self.free_pos[index]
+        if pos < 0:
+            return
+        last = self.free_cells.pop()
+        if last != index:
+            self.free_cells[pos] = last
+            self.free_pos[last] = pos
+        self.free_pos[index] = -1
+
+    def _release(self, index):
+        if self.free_pos[index] < 0:
+            self.free_pos[index] = len(self.free_cells)
+            self.free_cells.append(index)
+
+    def _place_green(self, cell):
+        if cell is not None:
+            x, y = cell
+            self.green_apples.append(cell)
+            self.green_mask |= 1 << (y * self.grid_size + x)
+            self._take(y * self.grid_size + x)
+
+    def _place_red(self, cell):
+        if cell is not None:
+            x, y = cell
+            self.red_apple = cell
+            self.red_mask = 1 << (y * self.grid_size + x)
+            self._take(y * self.grid_size + x)
+
+    def is_body(self, cell):
+        x, y = cell
+        return (0 <= x < self.grid_size and 0 <= y < self.grid_size
+                and self.occupancy[y * self.grid_size + x] > 0)
+
+    def _bit(self, cell):
+        x, y = cell
+        if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+            return 1 << (y * self.grid_size + x)
+        return 0
+
+    def step(self, action):
+        """
+        Apply an action and return (next_state, reward, done).
+
+        The reward and next state are measured right after the move, before
+        eaten apples respawn, exactly like the original training loop.
+        """
+        self.snake_dir = action_to_direction(action, self.snake_dir)
+        prev_head = self.snake[0]
+        self.move_snake()
+        reward = self.calculate_reward(prev_head)
+        next_state = self.get_state()
+        self.done = self.check_collisions()
+        self.steps += 1
+        return next_state, reward, self.done
+
+    def move_snake(self):
+        head = self.snake[0]
+        new_head = (head[0] + self.snake_dir[0], head[1] + self.snake_dir[1])
+        # Drop the tail first so the head may take the cell it leaves
+        snake = self.snake
+        while len(snake) >= self.snake_length and snake:
+            self._remove_segment(snake.pop())
+        snake.appendleft(new_head)
+        self._add_segment(new_head)
+
+    def _head_collides(self):
+        head_x, head_y = self.snake[0]
+        grid_size = self.grid_size
+        if (head_x < 0 or head_x >= grid_size
+                or head_y < 0 or head_y >= grid_size):
+            return True
+        # The head counts once; a second segment on its cell is a collision
+        return self.occupancy[head_y * grid_size + head_x] > 1
+
+    def calculate_reward(self, prev_head):
+        # Same rules as q_algorithm.calculate_reward, in O(1)
+        head = self.snake[0]
+        if head in self.green_apples:
+            return 10
+        if head == self.red_apple:
+            return -10
+        if self._head_collides():
+            return -100
+        if len(self.snake) < 2:
+            return -1
+        closest_green_apple = min(self.green_apples,
+                                  key=lambda apple: abs(apple[0] - head[0])
+                                  + abs(apple[1] - head[1]))
+        # Like calculate_reward, only the x distance is compared
+        if (abs(closest_green_apple[0] - head[0])
+                < abs(closest_green_apple[0] - prev_head[0])):
+            return 1
+        return -1
+
+    def check_collisions(self):
+        # Check wall and self collision
+        if self._head_collides():
+            return True
+
+        # Check green apple collision
+        for apple in self.green_apples:
+            if self.snake[0] == apple:
+                self.snake_length += 1
+                self.green_apples.remove(apple)
+                self.green_mask &= ~self._bit(apple)
+                self._place_green(self._random_empty_cell())
+
+        # Check red apple collision
+        if self.snake[0] == self.red_apple:
+            self.snake_length -= 1
+            if self.snake_length <= 0:
+                return True
+            self._place_red(self._random_empty_cell())
+
+        return False
+
+    def _random_empty_cell(self):
+        if not self.free_cells:
+            return None
+        index = self.free_cells[self.rng.randrange(len(self.free_cells))]
+        return (index % self.grid_size, index // self.grid_size)
+
+    def restore(self, board):
+        # board: (snake, snake_dir, snake_length, green_apples, red_apple)
+        snake, snake_dir, snake_length, green_apples, red_apple = board
+        self._set_body(snake)
+        self.snake_dir = snake_dir
+        self.snake_length = snake_length
+        self.green_apples = []
+        self.red_apple = None
+        for cell in green_apples:
+            self._place_green(cell)
+        self._place_red(red_apple)
+
+    def vision_cells(self):
+        # Cells along the four vision rays (same directions as get_state)
+        head_x, head_y = self.snake[0]
+        vision = set()
+        for dx, dy in DIRECTIONS:
+            x, y = head_x + dx, head_y + dy
+            while 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+                vision.add((x, y))
+                x += dx
+                y += dy
+        return vision
@@ -1,82 +1,33 @@
-from q_algorithm import (
-    choose_action,
-    get_state,
-    update_q_value,
-    action_to_direction,
-    calculate_reward,
-)
-import pygame
-import random
+from q_algorithm import choose_action, update_q_value
 import sys
-import matplotlib.pyplot as plt
 from config import (
     GRID_SIZE,
-    CELL_SIZE,
-    SCREEN_SIZE,
     SCREEN_WIDTH,
     SCREEN_HEIGHT,
     FPS,
 )
-from config import (
-    BACKGROUND_COLOR,
-    SNAKE_COLOR,
-    SNAKE_EYE_COLOR,
-    APPLE_GREEN_COLOR,
-    APPLE_RED_COLOR,
-)
-import os
-
-# Initialize pygame
-pygame.init()
-
-
-def init_snake(length=3):
-    dirs = [(0, -1), (0, 1), (-1, 0), (1, 0)]  # Up, Down, Left, Right
-    dx, dy = random.choice(dirs)
-    if dx == 1:        # moving right, body extends left
-        min_x = length - 1
-        max_x = GRID_SIZE - 1
-    elif dx == -1:     # moving left, body extends right
-        min_x = 0
-        max_x = GRID_SIZE - length
-    else:              # vertical movement, any x
-        min_x = 0
-        max_x = GRID_SIZE - 1
-
-    if dy == 1:        # moving down, body extends up
-        min_y = length - 1
-        max_y = GRID_SIZE - 1
-    elif dy == -1:     # moving up, body extends down
-        min_y = 0
-        max_y = GRID_SIZE - length
-    else:              # horizontal movement, any y
-        min_y = 0
-        max_y = GRID_SIZE - 1
-
-    head_x = random.randint(min_x, max_x)
-    head_y = random.randint(min_y, max_y)
-
-    # Body segments placed opposite movement direction
-    snake = [(head_x, head_y)]
-    for i in range(1, length):
-        snake.append((head_x - dx * i, head_y - dy * i))
-    return snake, (dx, dy), length
+import itertools
+import random
+import signal
+import threading
+import time
+from snake_env import SnakeEnv
+from batch_env import BatchSnakeEnv, DIRECTIONS
+from q_table_storage import DenseQTable
+from bounded_q_table import BoundedQTable
+from symmetry import SymmetricQTable
+from state_encoding import encode_state, encode_states
+from evaluation import evaluate, play_game, format_report
+from metrics import TrainingMetrics, plot_training_log
+from profiler import format_profile
+from trajectory import Trajectory, save_trajectories
+from checkpoint import save_checkpoint
+import numpy as np
 
 
 # Track the last 5 moves made by the AI
 last_moves = []
 
-
-# Initialize apples
-green_apples = []  # List to store green apple positions
-red_apple = None   # Variable to store red apple position
-
-# Clock
-clock = pygame.time.Clock()
-
-# Random snake spawn
-snake, snake_dir, snake_length = init_snake()
-
 # Track when the current game started (ticks)
 game_start_ticks = 0
 
@@ -85,6 +36,16 @@ def prune_q_table(q_table, threshold=0.01):
     """
     Remove entries with Q-values close to zero and keep only last 1000 entries.
     """
+    if isinstance(q_table, DenseQTable):
+        q_table.prune(threshold)
+        return q_table
+    if isinstance(q_table, BoundedQTable):
+        # Size is already capped by its eviction policy
+        return q_table
+    if isinstance(q_table, SymmetricQTable):
+        q_table.table = prune_q_table(q_table.table, threshold)
+        return q_table
+
     # Remove entries with Q-values close to zero
     keys_to_remove = [
         key for key, value in q_table.items() if abs(value) < threshold
@@ -94,258 +55,39 @@ def prune_q_table(q_table, threshold=0.01):
     return q_table
 
 
-# Function to draw the grid
-def draw_grid():
-    for x in range(0, SCREEN_SIZE, CELL_SIZE):
-        for y in range(0, SCREEN_SIZE, CELL_SIZE):
-            rect = pygame.Rect(x, y, CELL_SIZE, CELL_SIZE)
-            # Alternate between two shades of blue for the checkered pattern
-            if (x // CELL_SIZE + y // CELL_SIZE) % 2 == 0:
-                color = (100, 149, 237)
-            else:
-                color = (70, 130, 180)
-            pygame.draw.rect(screen, color, rect)
-
-
-# Function to draw the snake
-def draw_snake():
-    for i, segment in enumerate(snake):
-        rect = pygame.Rect(segment[0] * CELL_SIZE, segment[1] * CELL_SIZE,
-                           CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(screen, SNAKE_COLOR, rect)  # Fill the snake body
-        if i == 0:  # Draw googly eyes on the head
-            eye_radius = CELL_SIZE // 8
-            eye_offset = CELL_SIZE // 4
-            eye1 = (segment[0] * CELL_SIZE + eye_offset,
-                    segment[1] * CELL_SIZE + eye_offset)
-            eye2 = (segment[0] * CELL_SIZE + CELL_SIZE - eye_offset,
-                    segment[1] * CELL_SIZE + eye_offset)
-            pygame.draw.circle(screen, SNAKE_EYE_COLOR, eye1, eye_radius)
-            pygame.draw.circle(screen, SNAKE_EYE_COLOR, eye2, eye_radius)
-
-
-# Function to draw apples
-def draw_apples():
-    global red_apple
-
-    G_S = GRID_SIZE
-
-    def get_empty_spaces():
-        # Get all grid positions that are not occupied by the snake or apples
-        occupied = set(snake + green_apples + [red_apple])
-        return [
-            (x, y)
-            for x in range(GRID_SIZE)
-            for y in range(GRID_SIZE)
-            if (x, y) not in occupied
-        ]
-
-    # Ensure green_apples and red_apple are initialized
-    if not green_apples:
-        green_apples.extend([
-            (random.randint(0, G_S - 1), random.randint(0, G_S - 1))
-            for _ in range(2)
-        ])
-    if not red_apple:
-        red_apple = (random.randint(0, GRID_SIZE - 1),
-                     random.randint(0, GRID_SIZE - 1))
-
-    empty_spaces = get_empty_spaces()
-
-    # Redraw green apples if they overlap with the snake or each other
-    for i in range(len(green_apples)):
-        if green_apples[i] in snake or green_apples[i] in green_apples[:i]:
-            if empty_spaces:
-                green_apples[i] = random.choice(empty_spaces)
-                empty_spaces.remove(green_apples[i])
-
-    # Redraw red apple if it overlaps with the snake or green apples
-    if red_apple in snake or red_apple in green_apples:
-        if empty_spaces:
-            red_apple = random.choice(empty_spaces)
-            empty_spaces.remove(red_apple)
-
-    # Draw green apples
-    for apple in green_apples:
-        rect = pygame.Rect(apple[0] * CELL_SIZE,
-                           apple[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(screen, APPLE_GREEN_COLOR, rect)
-
-    # Draw red apple
-    rect = pygame.Rect(red_apple[0] * CELL_SIZE,
-                       red_apple[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-    pygame.draw.rect(screen, APPLE_RED_COLOR, rect)
-
-
-# Function to move the snake
-def move_snake():
-    global snake
-    new_head = (snake[0][0] + snake_dir[0], snake[0][1] + snake_dir[1])
-    snake = [new_head] + snake[:snake_length - 1]
-    # print(f"Snake moved to {new_head} in direction {snake_dir}")
-
-
-# Function to check collisions
-def check_collisions():
-    global snake_length, red_apple
-
-    # Helper function to get all empty spaces
-    def get_empty_spaces():
-        occupied = set(snake + green_apples + [red_apple])
-        return [
-            (x, y)
-            for x in range(GRID_SIZE)
-            for y in range(GRID_SIZE)
-            if (x, y) not in occupied
-        ]
-
-    # Check wall collision
-    head_x, head_y = snake[0]
-    if head_x < 0 or head_x >= GRID_SIZE or head_y < 0 or head_y >= GRID_SIZE:
-        return True
-
-    # Check self collision
-    if snake[0] in snake[1:]:
-        return True
-
-    # Check green apple collision
-    for apple in green_apples:
-        if snake[0] == apple:
-            snake_length += 1
-            green_apples.remove(apple)
-            empty_spaces = get_empty_spaces()
-            if empty_spaces:
-                green_apples.append(random.choice(empty_spaces))
-
-    # Check red apple collision
-    if snake[0] == red_apple:
-        snake_length -= 1
-        if snake_length <= 0:
-            return True
-        empty_spaces = get_empty_spaces()
-        if empty_spaces:
-            red_apple = random.choice(empty_spaces)
-
-    return False
-
-
-# New helper to get vision ray cells (same logic directions as get_state)
-def get_vision_cells():
-    head_x, head_y = snake[0]
-    dirs = [(0, -1), (0, 1), (-1, 0), (1, 0)]
-    vision = set()
-    for dx, dy in dirs:
-        x, y = head_x + dx, head_y + dy
-        while 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
-            vision.add((x, y))
-            x += dx
-            y += dy
-    return vision
-
-
-def draw_mini_board():
-    # Mini board parameters
-    padding = 10
-    area_width = 200 - 2 * padding
-    mini_cell = max(6, area_width // GRID_SIZE)
-    origin_x = SCREEN_SIZE + padding
-    origin_y = padding
-
-    vision_cells = get_vision_cells()
-    head = snake[0]
-
-    HIDDEN_COLOR = (15, 15, 15)   # Fully hidden
-    VISION_BG_COLOR = (65, 65, 65)
-    HEAD_COLOR = (0, 255, 0)
-
-    for y in range(GRID_SIZE):
-        for x in range(GRID_SIZE):
-            rect = pygame.Rect(origin_x + x * mini_cell,
-                               origin_y + y * mini_cell,
-                               mini_cell - 1,
-                               mini_cell - 1)
-
-            visible = (x, y) in vision_cells or (x, y) == head
-            if not visible:
-                # Completely hidden cell (no objects shown)
-                pygame.draw.rect(screen, HIDDEN_COLOR, rect)
-                continue
-
-            # Background for visible ray cells
-            pygame.draw.rect(screen, VISION_BG_COLOR, rect)
-
-            # Draw entities only if visible
-            if (x, y) == head:
-                pygame.draw.rect(screen, HEAD_COLOR, rect)
-            elif (x, y) in snake[1:]:
-                pygame.draw.rect(screen, SNAKE_COLOR, rect)
-            elif (x, y) in green_apples:
-                pygame.draw.rect(screen, APPLE_GREEN_COLOR, rect)
-            elif (x, y) == red_apple:
-                pygame.draw.rect(screen, APPLE_RED_COLOR, rect)
-
-    # Outline
-    outline_rect = pygame.Rect(origin_x - 2, origin_y - 2,
-                               GRID_SIZE * mini_cell + 3,
-                               GRID_SIZE * mini_cell + 3)
-    pygame.draw.rect(screen, (200, 200, 200), outline_rect, 2)
-
-
-def draw_right_section():
-    # Background
-    right_section_rect = pygame.Rect(SCREEN_SIZE, 0, 200, SCREEN_HEIGHT)
-    pygame.draw.rect(screen, (40, 40, 40), right_section_rect)
-
-    draw_mini_board()
-
-    font = pygame.font.Font(None, 26)
-    text_color = (255, 255, 255)
-
-    # Position text under mini board
-    text_start_y = 10 + (200 - 20) // GRID_SIZE * GRID_SIZE
-    text_start_y = max(text_start_y,
-                       10 + 10 + ((200 - 20) // GRID_SIZE) * GRID_SIZE)
-    text_start_y += 20
-
-    # Elapsed time in seconds
-    elapsed_sec = max(0, (pygame.time.get_ticks() - game_start_ticks) / 1000.0)
-
-    length_text = font.render(f"Length: {snake_length}", True, text_color)
-    screen.blit(length_text, (SCREEN_SIZE + 10, text_start_y))
-
-    time_text = font.render(f"Time: {elapsed_sec:.1f}s", True, text_color)
-    screen.blit(time_text, (SCREEN_SIZE + 10, text_start_y + 28))
-
-    for i, move in enumerate(last_moves[-5:]):
-        mv = font.render(f"{move}", True, text_color)
-        screen.blit(mv, (SCREEN_SIZE + 20, text_start_y + 55 + i * 22))
-
-    pygame.draw.line(screen, (255, 255, 255),
-                     (SCREEN_SIZE, 0), (SCREEN_SIZE, SCREEN_HEIGHT), 2)
-
-
-def build_ascii_board():
-    board = [['.' for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-    vision = get_vision_cells()
-    head = snake[0]
+# pygame (through renderer) is only imported by the functions that draw,
+# so training, evaluation and headless play start without it
+
+
+def draw_frame(screen, env, start_ticks=0):
+    from renderer import BoardRenderer
+    # Full redraw; games in progress keep one BoardRenderer instead
+    BoardRenderer(screen, env.grid_size).draw(env, start_ticks, last_moves)
+
+
+def build_ascii_board(env):
+    grid_size = env.grid_size
+    board = [['.' for _ in range(grid_size)] for _ in range(grid_size)]
+    vision = env.vision_cells()
+    head = env.snake[0]
 
     # Mark visible empty cells first
     for (x, y) in vision | {head}:
-        if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
+        if 0 <= x < grid_size and 0 <= y < grid_size:
             board[y][x] = '0'
 
     # Entities override
     # Body (excluding head)
-    for seg in snake[1:]:
+    for seg in itertools.islice(env.snake, 1, None):
         if seg in vision:
             x, y = seg
             board[y][x] = 'S'
     # Apples
-    for ax, ay in green_apples:
+    for ax, ay in env.green_apples:
         if (ax, ay) in vision:
             board[ay][ax] = 'G'
-    if red_apple in vision:
-        rx, ry = red_apple
+    if env.red_apple in vision:
+        rx, ry = env.red_apple
         board[ry][rx] = 'R'
     # Head last
     hx, hy = head
@@ -355,6 +97,7 @@ def build_ascii_board():
 
 
 def wait_for_close():
+    import pygame
     # Wait until user closes the window, presses any key, or clicks
     while True:
         for event in pygame.event.get():
@@ -364,13 +107,35 @@ def wait_for_close():
         pygame.time.delay(50)
 
 
-def play(q_table, verbose=False):
-    global snake, snake_dir, snake_length
-    global green_apples, red_apple, screen, g_s_tick
+def draw_end_overlay(screen, title, env, start_ticks):
+    import pygame
+    from renderer import font, text
+    # Show final frame with a simple overlay
+    overlay_bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    overlay_bg.fill((0, 0, 0, 120))
+    screen.blit(overlay_bg, (0, 0))
+    elapsed_sec = max(0, (pygame.time.get_ticks() - start_ticks) / 1000.0)
+    text1 = text(title, 48)
+    text2 = font(28).render(
+        f"Final Length: {env.snake_length}, Final Direction: {env.snake_dir} "
+        f"Time: {elapsed_sec:.1f}s", True, (255, 255, 255)
+    )
+    text3 = text("Press any key or click to exit", 28, (200, 200, 200))
+    screen.blit(text1, (SCREEN_WIDTH // 2 - text1.get_width() // 2,
+                        SCREEN_HEIGHT // 2 - 60))
+    screen.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2,
+                        SCREEN_HEIGHT // 2 - 20))
+    screen.blit(text3, (SCREEN_WIDTH // 2 - text3.get_width() // 2,
+                        SCREEN_HEIGHT // 2 + 20))
+    pygame.display.flip()
+
+
+def play(q_table, verbose=False, seed=None, grid_size=GRID_SIZE):
+    import pygame
+    from renderer import BoardRenderer
+    pygame.init()
     # Re-randomize snake & apples at start of play
-    snake, snake_dir, snake_length = init_snake()
-    green_apples = []
-    red_apple = None
+    env = SnakeEnv(grid_size=grid_size, seed=seed)
 
     # Start timer for this game
     g_s_tick = pygame.time.get_ticks()
@@ -380,303 +145,348 @@ def play(q_table, verbose=False):
     # Initialize the screen for playing
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Snake Game - Play Mode")
+    renderer = BoardRenderer(screen, grid_size)
 
-    running = True
     clock = pygame.time.Clock()
+    state = env.get_state()
 
-    while running:
+    while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
-        screen.fill(BACKGROUND_COLOR)
-        draw_grid()
-        draw_snake()
-        draw_apples()
-        draw_right_section()
-        pygame.display.flip()
-
-        # Get the current state
-        state = get_state(snake, green_apples, red_apple)
+        renderer.draw(env, g_s_tick, last_moves)
 
         # Choose the best action based on the Q-table (exploit only)
-        action = choose_action(state, 0.01, snake_dir, q_table)
-        snake_dir = action_to_direction(action, snake_dir)
+        action = choose_action(state, 0.01, env.snake_dir, q_table)
 
         if verbose:
-            print(build_ascii_board())
+            print(build_ascii_board(env))
             print(f"Chosen action: {action_names.get(action)}")
 
-        # Move the snake
-        move_snake()
-
-        # Check for collisions
-        if check_collisions():
-            print(f"Game Over!, Final Length: {snake_length}")
-            # Show final frame with a simple overlay and wait for user
-            overlay_bg = pygame.Surface((SCREEN_WIDTH,
-                                         SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay_bg.fill((0, 0, 0, 120))
-            screen.blit(overlay_bg, (0, 0))
-            font_big = pygame.font.Font(None, 48)
-            font_small = pygame.font.Font(None, 28)
-            elapsed_sec = max(0, (pygame.time.get_ticks() - g_s_tick) / 1000.0)
-            text1 = font_big.render("Game Over", True, (255, 255, 255))
-            text2 = font_small.render(
-                f"Final Length: {snake_length}, Final Direction: {snake_dir} "
-                f"Time: {elapsed_sec:.1f}s", True, (255, 255, 255)
-            )
-            text3 = font_small.render("Press any key or click to exit",
-                                      True, (200, 200, 200))
-            screen.blit(text1, (SCREEN_WIDTH // 2 - text1.get_width() // 2,
-                                SCREEN_HEIGHT // 2 - 60))
-            screen.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2,
-                                SCREEN_HEIGHT // 2 - 20))
-            screen.blit(text3, (SCREEN_WIDTH // 2 - text3.get_width() // 2,
-                                SCREEN_HEIGHT // 2 + 20))
-            pygame.display.flip()
+        # Move the snake and check for collisions
+        _, _, done = env.step(action)
+        if done:
+            print(f"Game Over!, Final Length: {env.snake_length}")
+            draw_end_overlay(screen, "Game Over", env, g_s_tick)
             wait_for_close()
             return  # do not auto-quit; return to caller
+        state = env.get_state()
 
         # Control the game speed
         clock.tick(FPS)
 
 
-def play_multiple_games(q_table, verbose=False, num_games=1000):
-    global snake, snake_dir, snake_length, green_apples, red_apple
-
-    max_length = 0
-    total_length = 0
-    best_game_states = []
-
-    action_names = {0: "UP", 1: "DOWN", 2: "LEFT", 3: "RIGHT"}
-
-    for game in range(num_games):
-        # Reset the game state (random spawn)
-        snake, snake_dir, snake_length = init_snake()
-        green_apples = [(random.randint(0, GRID_SIZE - 1),
-                         random.randint(0, GRID_SIZE - 1)) for _ in range(2)]
-        red_apple = (random.randint(0, GRID_SIZE - 1),
-                     random.randint(0, GRID_SIZE - 1))
-
-        game_states = []  # To store the states of this game
-        running = True
-
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-            # Save the current state for replay
-            game_states.append((list(snake), snake_dir,
-                                snake_length, list(green_apples), red_apple))
-
-            # Get the current state
-            state = get_state(snake, green_apples, red_apple)
-
-            # Choose the best action based on the Q-table (exploit only)
-            action = choose_action(state, 0.01, snake_dir, q_table)
-            snake_dir = action_to_direction(action, snake_dir)
+def play_multiple_games(q_table, verbose=False, num_games=1000, workers=None,
+                        base_seed=0, record=None, profiler=None,
+                        grid_size=GRID_SIZE):
+    # Evaluate headless over a process pool, one seed per game
+    stats = evaluate(q_table, num_games, workers=workers, base_seed=base_seed,
+                     grid_size=grid_size, profiler=profiler)
+    print(f"All {num_games} games averaged a length of {stats['mean']:.2f}.")
+    print(format_report(stats))
+    if profiler is not None:
+        print(format_profile(profiler.summary()))
+    print(f"Best game achieved a length of {stats['max']}. "
+          "Replaying it now...")
 
-            if verbose:
-                print(build_ascii_board())
-                print(f"Chosen action: {action_names.get(action)}")
+    best_game = record_best_game(q_table, stats, grid_size, verbose)
+    if record:
+        save_trajectories([best_game], record)
+    replay_game(best_game)
 
-            # Move the snake
-            move_snake()
 
-            # Check for collisions
-            if check_collisions():
-                running = False
-
-        # Update total length for average calculation
-        total_length += snake_length
-
-        # Check if this game achieved a new maximum length
-        if snake_length > max_length:
-            max_length = snake_length
-            best_game_states = game_states
+def record_best_game(q_table, stats, grid_size=GRID_SIZE, verbose=False):
+    # Only the best game of an evaluation is simulated again, from its seed
+    action_names = {0: "UP", 1: "DOWN", 2: "LEFT", 3: "RIGHT"}
+    best_game = Trajectory(stats["best_seed"], grid_size)
 
-    avg_length = total_length / num_games
-    print(f"All {num_games} games averaged a length of {avg_length:.2f}.")
-    print(f"Best game achieved a length of {max_length}. Replaying it now...")
+    def on_step(env, action):
+        # Only the action is kept; replay rebuilds the frames from the seed
+        best_game.record(action)
+        if verbose:
+            print(build_ascii_board(env))
+            print(f"Chosen action: {action_names.get(action)}")
 
-    # Replay the best game
-    replay_game(best_game_states)
+    play_game(q_table, stats["best_seed"], grid_size, on_step=on_step)
+    return best_game
 
 
-def replay_game(game_states):
-    global snake, snake_dir, snake_length, green_apples, red_apple, screen
+def replay_game(trajectory):
+    import pygame
+    from renderer import BoardRenderer
+    pygame.init()
 
     # Initialize the screen for replay
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Snake Game - Replay of Best Game")
+    renderer = BoardRenderer(screen, trajectory.grid_size)
 
     clock = pygame.time.Clock()
 
-    for state in game_states:
+    env = None
+    for env in trajectory.frames():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()  # Exit the program gracefully
-        snake, snake_dir, snake_length, green_apples, red_apple = state
-
-        screen.fill(BACKGROUND_COLOR)
-        draw_grid()
-        draw_snake()
-        draw_apples()
-        draw_right_section()
-        pygame.display.flip()
+        renderer.draw(env, game_start_ticks, last_moves)
 
         clock.tick(FPS)  # Control the replay speed
 
     print("Replay completed!")
-    # Show final frame with a simple overlay and wait for user
-    overlay_bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay_bg.fill((0, 0, 0, 120))
-    screen.blit(overlay_bg, (0, 0))
-    font_big = pygame.font.Font(None, 48)
-    font_small = pygame.font.Font(None, 28)
-    elapsed_sec = max(0, (pygame.time.get_ticks() - game_start_ticks) / 1000.0)
-    text1 = font_big.render("Replay Over", True, (255, 255, 255))
-    text2 = font_small.render(f"Final Length: {snake_length}, Final Direction:\
-    {snake_dir}   Time: {elapsed_sec:.1f}s", True, (255, 255, 255))
-    text3 = font_small.render("Press any key or click to exit", True,
-                              (200, 200, 200))
-    screen.blit(text1, (SCREEN_WIDTH // 2 - text1.get_width() // 2,
-                        SCREEN_HEIGHT // 2 - 60))
-    screen.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2,
-                        SCREEN_HEIGHT // 2 - 20))
-    screen.blit(text3, (SCREEN_WIDTH // 2 - text3.get_width() // 2,
-                        SCREEN_HEIGHT // 2 + 20))
-    pygame.display.flip()
+    if env is None:
+        env = trajectory.final_env()
+    draw_end_overlay(screen, "Replay Over", env, game_start_ticks)
     wait_for_close()
     return  # do not auto-quit; return to caller
 
 
-def train(num_episodes, epsilon, alpha, gamma, q_table):
-    global snake, snake_dir, snake_length, green_apples, red_apple, screen
-
-    rewards_per_episode = []  # List to store rewards for each episode
-    length_per_episode = []  # List to store length for each episode
-    max_length = 0  # Track the global maximum length
-
-    for episode in range(num_episodes):
-        # Random snake each episode
-        snake, snake_dir, snake_length = init_snake()
-        green_apples = [(random.randint(0, GRID_SIZE - 1),
-                         random.randint(0, GRID_SIZE - 1)) for _ in range(2)]
-        red_apple = (random.randint(0, GRID_SIZE - 1),
-                     random.randint(0, GRID_SIZE - 1))
-
-        # Decay epsilon but keep it above 0.01
-        epsilon = max(0.01, epsilon * 0.99995)
-
-        # Track cumulative reward for this episode
-        cumulative_reward = 0
-
-        render = (episode + 1) % 10000 == 0  # Render every 1000 episodes
-
-        if episode % 1000 == 0:  # Prune every 1000 episodes
-            q_table = prune_q_table(q_table)
-
-        if render:
-            # Initialize the screen for rendering
-            screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-            pygame.display.set_caption(f"Training - Episode {episode + 1}")
+def train(num_episodes, epsilon, alpha, gamma, q_table, checkpoint=None,
+          checkpoint_every=1000, checkpoint_seconds=None, resume=None,
+          log_path=None, profiler=None, grid_size=GRID_SIZE,
+          render_every=10000, on_episode=None, stop=None, replay=None,
+          replay_batch=256, learner=None):
+    """
+    Train q_table in place for num_episodes episodes.
+
+    Per-episode stats are streamed to a CSV log (log_path, or a new file
+    in training_statistics/) and plotted from it at the end. With a
+    checkpoint path, the full training state is saved atomically
+    every checkpoint_every episodes (0 or None: off) and/or
+    checkpoint_seconds seconds, at the end, and when Ctrl-C is pressed
+    (after the running episode; press twice to abort at once). Pass a
+    loaded checkpoint as resume to continue it. Pass a Profiler to time
+    each phase of the loop.
+
+    Every render_every-th episode is shown in a window (None: never).
+    on_episode(episode, length) is called after each episode; setting stop
+    (a threading.Event) ends training after the running episode, like
+    Ctrl-C.
+
+    With a ReplayBuffer as replay (DenseQTable only), every transition is
+    also stored in it, and one mini-batch of replay_batch stored
+    transitions is replayed after each episode. The buffer is not part of
+    checkpoints.
+
+    A learner from learners.LEARNERS, built on q_table, replaces the
+    one-step update_q_value.
+    """
+    start_episode = 0
+    if resume is not None:
+        grid_size = resume["grid_size"]
+    env = SnakeEnv(grid_size=grid_size)
+
+    if resume is not None:
+        epsilon = resume["epsilon"]
+        start_episode = resume["episode"]
+        metrics = TrainingMetrics.from_state(resume["metrics"])
+        env.rng.setstate(resume["env_rng"])
+        random.setstate(resume["rng"])
+        print(f"Resuming training at episode {start_episode}.")
+    else:
+        metrics = TrainingMetrics(log_path)
+
+    choose, update, prune, draw = (choose_action, update_q_value,
+                                   prune_q_table, None)
+    if profiler is not None:
+        profiler.instrument(env)
+        choose = profiler.timed("choose_action", choose_action)
+        update = profiler.timed("update_q_value", update_q_value)
+        prune = profiler.timed("prune", prune_q_table)
+    if learner is not None:
+        learn = learner.update
+        if profiler is not None:
+            learn = profiler.timed("learner", learner.update)
+    if replay is not None:
+        replay_batch_update = replay.replay
+        if profiler is not None:
+            replay_batch_update = profiler.timed("replay", replay.replay)
+
+    stop_requested = []
+
+    def request_stop(signum, frame):
+        if stop_requested:
+            raise KeyboardInterrupt
+        stop_requested.append(signum)
+        print("Stopping after this episode (Ctrl-C again to abort)...")
+
+    # Signal handlers can only be installed from the main thread
+    catch_interrupt = (checkpoint is not None and threading.current_thread()
+                       is threading.main_thread())
+    if catch_interrupt:
+        previous_handler = signal.signal(signal.SIGINT, request_stop)
+    last_checkpoint = time.monotonic()
+
+    try:
+        for episode in range(start_episode, num_episodes):
+            # Random snake each episode
+            state = env.reset()
+
+            # Decay epsilon but keep it above 0.01
+            epsilon = max(0.01, epsilon * 0.99995)
+
+            # Track cumulative reward for this episode
+            cumulative_reward = 0
+
+            render = (render_every is not None
+                      and (episode + 1) % render_every == 0)
+
+            if episode % 1000 == 0:  # Prune every 1000 episodes
+                q_table = prune(q_table)
 
-        while True:
             if render:
-                screen.fill(BACKGROUND_COLOR)
-                draw_grid()
-                draw_snake()
-                draw_apples()
-                draw_right_section()
-                pygame.display.flip()
-
-            state = get_state(snake, green_apples, red_apple)
-            action = choose_action(state, epsilon, snake_dir, q_table)
-            snake_dir = action_to_direction(action, snake_dir)
-            move_snake()
-            reward = calculate_reward(snake, green_apples,
-                                      red_apple, GRID_SIZE)
-            cumulative_reward += reward  # Add reward to cumulative reward
-            next_state = get_state(snake, green_apples, red_apple)
-            update_q_value(state, action, reward, next_state,
+                import pygame
+                from renderer import BoardRenderer
+                if draw is None:
+                    draw = BoardRenderer.draw
+                    if profiler is not None:
+                        draw = profiler.timed("render", draw)
+                # Initialize the screen for rendering
+                pygame.init()
+                screen = pygame.display.set_mode((SCREEN_WIDTH,
+                                                  SCREEN_HEIGHT))
+                pygame.display.set_caption(f"Training - Episode {episode + 1}")
+                clock = pygame.time.Clock()
+                renderer = BoardRenderer(screen, env.grid_size)
+
+            while True:
+                if render:
+                    draw(renderer, env)
+
+                action = choose(state, epsilon, env.snake_dir, q_table)
+                next_state, reward, done = env.step(action)
+                cumulative_reward += reward  # Add reward to cumulative reward
+                if learner is None:
+                    update(state, action, reward, next_state,
                            alpha, gamma, q_table)
-
-            if check_collisions():
-                break  # End the episode if the snake collides
+                else:
+                    learn(state, action, reward, next_state, done)
+                if replay is not None:
+                    replay.add(encode_state(state, grid_size), action,
+                               reward, encode_state(next_state, grid_size),
+                               done)
+
+                if done:
+                    break  # End the episode if the snake collides
+                state = env.get_state()
+
+                if render:
+                    clock.tick(30)  # Limit the frame rate to 30 FPS
+
+            if replay is not None:
+                replay_batch_update(q_table.values, replay_batch, alpha,
+                                    gamma)
+
+            # Log the cumulative reward and snake length for this episode
+            metrics.record(env.snake_length, cumulative_reward)
+            if profiler is not None:
+                profiler.end_episode(env, q_table)
+            if on_episode is not None:
+                on_episode(episode + 1, env.snake_length)
+            if stop is not None and stop.is_set():
+                stop_requested.append("stop")
+
+            # Print progress and average reward every 1000 episodes
+            if (episode + 1) % 1000 == 0:
+                metrics.report(num_episodes)
 
             if render:
-                clock.tick(30)  # Limit the frame rate to 30 FPS for rendering
-
-        # Store the cumulative reward and snake length for this episode
-        rewards_per_episode.append(cumulative_reward)
-        length_per_episode.append(snake_length)
-
-        # Update the global max length if needed
-        if snake_length > max_length:
-            max_length = snake_length
-
-        # Print progress and average reward every 100 episodes
-        if (episode + 1) % 1000 == 0:
-            avg_reward = sum(rewards_per_episode[-1000:]) / 1000
-            avg_length = sum(length_per_episode[-1000:]) / 1000
-            print(f"Episode {episode + 1}/{num_episodes} completed.\
-                  Average reward (last 1000 episodes): {avg_reward:.2f}.\
-                    Avg Length: {avg_length:.2f}. Max Length: {max_length}")
-
-        if render:
-            # Close the rendering window after the episode
-            pygame.display.quit()
-            pygame.display.init()
+                # Close the rendering window after the episode
+                pygame.display.quit()
+                pygame.display.init()
+
+            if checkpoint is not None and (
+                    stop_requested
+                    or episode + 1 == num_episodes
+                    or (checkpoint_every
+                        and (episode + 1) % checkpoint_every == 0)
+                    or (checkpoint_seconds is not None
+                        and time.monotonic() - last_checkpoint
+                        >= checkpoint_seconds)):
+                save_checkpoint(checkpoint, q_table=q_table,
+                                epsilon=epsilon, episode=episode + 1,
+                                num_episodes=num_episodes,
+                                grid_size=grid_size,
+                                env_rng=env.rng.getstate(),
+                                rng=random.getstate(),
+                                metrics=metrics.state())
+                last_checkpoint = time.monotonic()
+
+            if stop_requested:
+                print(f"Training interrupted after episode {episode + 1}"
+                      + (f", checkpoint saved to {checkpoint}."
+                         if checkpoint is not None else "."))
+                return
+    finally:
+        metrics.close()
+        if catch_interrupt:
+            signal.signal(signal.SIGINT, previous_handler)
 
     print("Training completed!")
-    plot_training_statistics(length_per_episode, max_length)
+    print(f"Statistics plot saved to {plot_training_log(metrics.log_path)}")
 
 
-def plot_training_statistics(length_per_episode, max_length):
-    # Calculate moving average of snake length over 1000 episodes
-    moving_avg_length = [
-        sum(length_per_episode[max(0, i-999):i+1]) / min(1000, i+1)
-        for i in range(len(length_per_episode))
-    ]
+def train_batch(num_episodes, epsilon, alpha, gamma, q_table, num_envs=1024,
+                seed=None, log_path=None):
+    """
+    Train a DenseQTable on num_envs boards stepped together.
 
-    # Track the maximum length over time
-    max_lengths_over_time = []
-    current_max = 0
-    for length in length_per_episode:
-        current_max = max(current_max, length)
-        max_lengths_over_time.append(current_max)
-
-    # Plot max length over time
-    plt.figure(figsize=(12, 6))
-    plt.plot(range(len(max_lengths_over_time)), max_lengths_over_time,
-             label="Max Length Over Time", color="blue", linewidth=2)
-
-    # Plot moving average of snake length
-    plt.plot(range(len(moving_avg_length)), moving_avg_length,
-             label="Moving Avg (1000 episodes)", color="orange", linewidth=2)
-
-    # Add grid, labels, and legend
-    plt.grid(True, linestyle="--", alpha=0.5)
-    plt.xlabel("Episode")
-    plt.ylabel("Snake Length")
-    plt.title("Snake Length Statistics During Training")
-    plt.legend()
-    plt.tight_layout()
-
-    # Save the graph as an image to the folder training_stats
-    folder = "training_statistics"
-    os.makedirs(folder, exist_ok=True)
-    filename = os.path.join(folder, "training_statistics.png")
-    if os.path.exists(filename):
-        base, ext = os.path.splitext("training_statistics.png")
-        counter = 1
-        while os.path.exists(os.path.join(folder, f"{base}_{counter}{ext}")):
-            counter += 1
-        filename = os.path.join(folder, f"{base}_{counter}{ext}")
-
-    plt.savefig(filename)
-    plt.show()
+    Same epsilon-greedy policy and one-step Q-learning update as train(),
+    applied to the whole batch with array operations. When several boards
+    update the same (state, action) in one step, the last write wins.
+    Exactly num_episodes episodes are recorded; boards still playing when
+    the last one ends are stopped there.
+    """
+    values = q_table.values
+    grid_size = q_table.grid_size
+    env = BatchSnakeEnv(num_envs, grid_size=grid_size, seed=seed)
+    rng = np.random.default_rng(seed)
+    rows = np.arange(num_envs)
+
+    metrics = TrainingMetrics(log_path)
+    episode_rewards = np.zeros(num_envs, dtype=np.int64)
+    episodes = 0
+    next_report = 1000
+
+    states = encode_states(env.states(), grid_size)
+    while episodes < num_episodes:
+        # Action opposite to the current direction is never allowed
+        reverse = (DIRECTIONS[None, :, :] == -env.dir[:, None, :]) \
+            .all(axis=2).argmax(axis=1)
+        q = values[states]
+        q[rows, reverse] = -np.inf
+        actions = q.argmax(axis=1)
+        explore = rng.random(num_envs) < epsilon
+        random_actions = rng.integers(0, 3, size=num_envs)
+        random_actions += random_actions >= reverse
+        actions = np.where(explore, random_actions, actions)
+
+        next_states, rewards, dones = env.step(actions)
+        next_states = encode_states(next_states, grid_size)
+        target = rewards + gamma * values[next_states].max(axis=1)
+        current = values[states, actions]
+        values[states, actions] = current + alpha * (target - current)
+        episode_rewards += rewards
+
+        # Boards finishing past num_episodes in the last step are dropped
+        finished = np.flatnonzero(dones)[:num_episodes - episodes]
+        if len(finished):
+            for length, reward in zip(
+                    env.final_lengths[finished].tolist(),
+                    episode_rewards[finished].tolist()):
+                metrics.record(length, reward)
+            episode_rewards[finished] = 0
+            episodes += len(finished)
+            # Decay epsilon per finished episode, keep it above 0.01
+            epsilon = max(0.01, epsilon * 0.99995 ** len(finished))
+
+        if episodes >= next_report:
+            metrics.report(num_episodes)
+            next_report += 1000
+
+        states = encode_states(env.states(), grid_size)
+
+    metrics.close()
+    print("Training completed!")
+    print(f"Statistics plot saved to {plot_training_log(metrics.log_path)}")
@@ -0,0 +1,68 @@
+import numpy as np
+from config import GRID_SIZE
+
+# get_state returns four (distance, green, red, body) blocks. Opposite wall
+# distances always add up to grid_size + 1, so a state is fully described
+# by the head cell plus the 12 flags. States that do not fit (a head that
+# left the grid) share the last, terminal index.
+FLAG_BITS = 12
+FLAG_POSITIONS = (1, 2, 3, 5, 6, 7, 9, 10, 11, 13, 14, 15)
+
+
+def num_states(grid_size=GRID_SIZE):
+    return grid_size * grid_size * (1 << FLAG_BITS) + 1
+
+
+def terminal_index(grid_size=GRID_SIZE):
+    return num_states(grid_size) - 1
+
+
+def encode_state(state, grid_size=GRID_SIZE):
+    (up, g0, r0, b0, down, g1, r1, b1,
+     left, g2, r2, b2, right, g3, r3, b3) = state
+    up = round(up * grid_size)
+    left = round(left * grid_size)
+    if (up + round(down * grid_size) != grid_size + 1
+            or left + round(right * grid_size) != grid_size + 1
+            or not 1 <= up <= grid_size or not 1 <= left <= grid_size):
+        return terminal_index(grid_size)
+
+    flags = (bool(g0) << 11 | bool(r0) << 10 | bool(b0) << 9
+             | bool(g1) << 8 | bool(r1) << 7 | bool(b1) << 6
+             | bool(g2) << 5 | bool(r2) << 4 | bool(b2) << 3
+             | bool(g3) << 2 | bool(r3) << 1 | bool(b3))
+    cell = (up - 1) * grid_size + (left - 1)
+    return (cell << FLAG_BITS) | flags
+
+
+def decode_state(index, grid_size=GRID_SIZE):
+    if index == terminal_index(grid_size):
+        raise ValueError("The terminal index has no state")
+    cell, flags = divmod(index, 1 << FLAG_BITS)
+    y, x = divmod(cell, grid_size)
+    distances = (y + 1, grid_size - y, x + 1, grid_size - x)
+    bits = [bool(flags >> (FLAG_BITS - 1 - i) & 1) for i in range(FLAG_BITS)]
+    state = []
+    for d, distance in enumerate(distances):
+        state.append(round(distance / grid_size, 2))
+        state.extend(bits[d * 3:d * 3 + 3])
+    return tuple(state)
+
+
+def encode_states(states, grid_size=GRID_SIZE):
+    # Vectorized encode_state for an (N, 16) array of states
+    states = np.asarray(states)
+    up = np.rint(states[:, 0] * grid_size).astype(np.int64)
+    down = np.rint(states[:, 4] * grid_size).astype(np.int64)
+    left = np.rint(states[:, 8] * grid_size).astype(np.int64)
+    right = np.rint(states[:, 12] * grid_size).astype(np.int64)
+    valid = ((up + down == grid_size + 1) & (left + right == grid_size + 1)
+             & (up >= 1) & (up <= grid_size)
+             & (left >= 1) & (left <= grid_size))
+
+    flags = np.zeros(len(states), dtype=np.int64)
+    for pos in FLAG_POSITIONS:
+        flags = (flags << 1) | (states[:, pos] != 0)
+    cell = (up - 1) * grid_size + (left - 1)
+    return np.where(valid, (cell << FLAG_BITS) | flags,
+                    terminal_index(grid_size))
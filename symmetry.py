@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+# Same order as get_state and the actions: Up, Down, Left, Right
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+# A symmetry of the board is the direction each direction is sent to.
+# The first four keep the x and y axes apart; calculate_reward only looks
+# at the x distance, so only those leave the rewards unchanged.
+AXIS_SYMMETRIES = (
+    (0, 1, 2, 3),  # Identity
+    (1, 0, 2, 3),  # Up <-> down
+    (0, 1, 3, 2),  # Left <-> right
+    (1, 0, 3, 2),  # Half turn
+)
+ALL_SYMMETRIES = AXIS_SYMMETRIES + (
+    (2, 3, 0, 1),  # Transpose
+    (3, 2, 1, 0),  # Anti-transpose
+    (3, 2, 0, 1),  # Quarter turn clockwise
+    (2, 3, 1, 0),  # Quarter turn counterclockwise
+)
+SYMMETRIES = {4: AXIS_SYMMETRIES, 8: ALL_SYMMETRIES}
+
+
+def transform(state, symmetry):
+    # get_state blocks (distance, green, red, body) moved to their image
+    blocks = [None] * 4
+    for direction in range(4):
+        blocks[symmetry[direction]] = state[direction * 4:direction * 4 + 4]
+    return blocks[0] + blocks[1] + blocks[2] + blocks[3]
+
+
+@lru_cache(maxsize=1 << 16)
+def canonical(state, symmetries):
+    # (smallest transformed state, symmetry that gives it)
+    return min((transform(state, symmetry), symmetry)
+               for symmetry in symmetries)
+
+
+class SymmetricQTable:
+    """
+    Q-table storing one entry per class of symmetric states.
+
+    A state is looked up by its canonical form (the smallest of its
+    transforms) and actions are sent through the same symmetry, so an
+    update trains every symmetric variant at once. choose_action and
+    update_q_value unwrap it; the inner table may be a dict, a
+    BoundedQTable or a DenseQTable and only ever holds canonical states.
+    items() yields every variant, so exported and binary tables are
+    plain tables that need no canonicalization.
+    """
+
+    def __init__(self, table, symmetries=AXIS_SYMMETRIES):
+        self.table = table
+        self.symmetries = symmetries
+
+    def canonical(self, state):
+        return canonical(tuple(state), self.symmetries)
+
+    def canonical_direction(self, direction, symmetry):
+        if direction in DIRECTIONS:
+            return DIRECTIONS[symmetry[DIRECTIONS.index(direction)]]
+        return direction
+
+    def get(self, key, default=0):
+        state, action = key
+        state, symmetry = self.canonical(state)
+        return self.table.get((state, symmetry[action]), default)
+
+    def __len__(self):
+        return len(self.table)
+
+    def items(self):
+        # A state its own image under a symmetry gets the same variant key
+        # from two stored actions, so values are read back through get
+        seen = set()
+        for state, action in self.table.keys():
+            for symmetry in self.symmetries:
+                key = (transform(state, symmetry), symmetry[action])
+                if key not in seen:
+                    seen.add(key)
+                    yield key, self.get(key)
+
+    def keys(self):
+        for key, _ in self.items():
+            yield key
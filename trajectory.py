@@ -0,0 +1,85 @@
+import struct
+from config import GRID_SIZE
+from snake_env import SnakeEnv
+
+# File layout: MAGIC, then one record per trajectory:
+#   header (version, grid size, seed, number of actions)
+#   actions packed four per byte (2 bits each, first action lowest)
+MAGIC = b"L2ST"
+VERSION = 1
+RECORD_HEADER = struct.Struct("<BHQI")
+
+
+class Trajectory:
+    """
+    A game stored as its seed and its actions, one byte per action.
+
+    SnakeEnv draws every spawn from its own seeded RNG, so replaying the
+    actions from the same seed rebuilds every frame; nothing else needs to
+    be kept while a game is played.
+    """
+
+    def __init__(self, seed, grid_size=GRID_SIZE, actions=b""):
+        self.seed = seed
+        self.grid_size = grid_size
+        self.actions = bytearray(actions)
+
+    def record(self, action):
+        self.actions.append(action)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def frames(self):
+        # Yields the environment before each recorded action (lazily)
+        env = SnakeEnv(grid_size=self.grid_size, seed=self.seed)
+        for action in self.actions:
+            yield env
+            env.step(action)
+
+    def final_env(self):
+        env = SnakeEnv(grid_size=self.grid_size, seed=self.seed)
+        for action in self.actions:
+            env.step(action)
+        return env
+
+    def pack(self):
+        packed = bytearray((len(self.actions) + 3) // 4)
+        for i, action in enumerate(self.actions):
+            packed[i >> 2] |= action << ((i & 3) * 2)
+        return RECORD_HEADER.pack(VERSION, self.grid_size, self.seed,
+                                  len(self.actions)) + bytes(packed)
+
+    @classmethod
+    def unpack_from(cls, data, offset=0):
+        # Returns (trajectory, offset of the next record)
+        version, grid_size, seed, count = RECORD_HEADER.unpack_from(data,
+                                                                    offset)
+        if version != VERSION:
+            raise ValueError(f"Unsupported trajectory version {version}")
+        offset += RECORD_HEADER.size
+        size = (count + 3) // 4
+        packed = data[offset:offset + size]
+        actions = bytearray(packed[i >> 2] >> ((i & 3) * 2) & 3
+                            for i in range(count))
+        return cls(seed, grid_size, actions), offset + size
+
+
+def save_trajectories(trajectories, filename):
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        for trajectory in trajectories:
+            f.write(trajectory.pack())
+
+
+def load_trajectories(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{filename} is not a trajectory file")
+    trajectories = []
+    offset = len(MAGIC)
+    while offset < len(data):
+        trajectory, offset = Trajectory.unpack_from(data, offset)
+        trajectories.append(trajectory)
+    return trajectories
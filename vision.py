@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+
+# Same order as get_state: Up, Down, Left, Right
+RAY_DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+# ray_tables holds grid_size ** 2 masks of grid_size ** 2 bits per
+# direction, so larger boards cut their rays out of line masks per call
+RAY_TABLE_MAX_GRID = 64
+
+
+@lru_cache(maxsize=None)
+def line_tables(grid_size):
+    """
+    Column masks and wall distances of one grid size.
+
+    columns[x] holds the bits of every cell in column x. near[i] is the
+    normalized distance reported looking up from row i (or left from
+    column i), far[i] the one looking down (or right).
+    """
+    column = 0
+    for y in range(grid_size):
+        column |= 1 << (y * grid_size)
+    columns = tuple(column << x for x in range(grid_size))
+    near = tuple(round((i + 1) / grid_size, 2) for i in range(grid_size))
+    far = tuple(round((grid_size - i) / grid_size, 2)
+                for i in range(grid_size))
+    return columns, near, far
+
+
+def _rays(x, y, grid_size):
+    # ((mask, distance) per direction) seen from cell (x, y)
+    columns, near, far = line_tables(grid_size)
+    column = columns[x]
+    row_start = y * grid_size
+    below = row_start + grid_size
+    return (
+        (column & ((1 << row_start) - 1), near[y]),
+        (column >> below << below, far[y]),
+        (((1 << x) - 1) << row_start, near[x]),
+        (((1 << (grid_size - x - 1)) - 1) << (row_start + x + 1), far[x]),
+    )
+
+
+@lru_cache(maxsize=None)
+def ray_tables(grid_size):
+    """
+    Line-of-sight tables for one grid size, indexed by cell (y * size + x).
+
+    Each entry holds, for the four directions, the bitmask of the cells
+    seen from that cell and the normalized wall distance get_state reports.
+    Bit i of a mask is cell i, the same layout as the occupancy bitboards.
+    """
+    return tuple(_rays(x, y, grid_size)
+                 for y in range(grid_size) for x in range(grid_size))
+
+
+def cells_mask(cells, grid_size):
+    # Bitboard of a list of (x, y) cells; cells off the board are ignored
+    mask = 0
+    for x, y in cells:
+        if 0 <= x < grid_size and 0 <= y < grid_size:
+            mask |= 1 << (y * grid_size + x)
+    return mask
+
+
+def state_from_masks(head_index, body_mask, green_mask, red_mask, grid_size):
+    # The get_state tuple for an on-board head, from occupancy bitboards
+    if grid_size > RAY_TABLE_MAX_GRID:
+        rays = _rays(head_index % grid_size, head_index // grid_size,
+                     grid_size)
+    else:
+        rays = ray_tables(grid_size)[head_index]
+    state = []
+    for ray, distance in rays:
+        state.append(distance)
+        state.append(ray & green_mask != 0)
+        state.append(ray & red_mask != 0)
+        state.append(ray & body_mask != 0)
+    return tuple(state)